@@ -4,19 +4,45 @@ Logging Server - Phase 3 Implementation
 Centralized logging system for honeypot events with GeoIP enrichment
 """
 
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, Response
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import sqlite3
 import hashlib
 import json
+import orjson
 import datetime
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import ipaddress
+import pathlib
+import bisect
 import time
-from typing import Dict, Any, Optional
+import queue
+import atexit
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterable, Callable
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        # Request bodies stay on the stdlib parser: honeypots forward
+        # attacker-supplied payloads that may hold NaN/Infinity (rejected by
+        # orjson) or integers beyond 64 bits (which orjson turns into floats)
+        return json.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for frontend
 
 # Configuration
@@ -33,6 +59,12 @@ else:
     # Create in parent directory (root) by default
     DATABASE_FILE = os.path.join(PARENT_DIR, "honeypot.db")
 
+# GeoIP cache persisted next to the database between restarts
+GEOIP_CACHE_FILE = os.path.join(os.path.dirname(DATABASE_FILE), "geoip_cache.json")
+
+# Known scanner/bogon networks that are tagged without a GeoIP lookup
+NOISE_NETWORKS_FILE = os.path.join(BASE_DIR, "noise_networks.txt")
+
 LOG_LEVEL = logging.INFO
 
 # Set up logging
@@ -46,66 +78,520 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# SQLite tuning - journal_mode is persistent, the rest are per-connection
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'cache_size=-64000',
+    'temp_store=MEMORY',
+    'mmap_size=268435456',
+    'wal_autocheckpoint=1000',
+)
+
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    """Apply the performance PRAGMAs to a SQLite connection"""
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+
+# Connection pool - connections are reused across requests so the PRAGMAs,
+# statement cache and page cache stay warm instead of reconnecting per hit
+DB_POOL_SIZE = 16
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+# Larger per-connection statement cache so the fixed endpoint queries stay prepared
+DB_CACHED_STATEMENTS = 256
+
+# Rows pulled from the cursor at a time when streaming a query's results
+QUERY_FETCH_SIZE = 100
+
+# Dedicated insert connection, shared by the flusher thread and the atexit flush
+_writer_conn = None
+_writer_lock = threading.Lock()
+
+def _open_connection(row_factory=sqlite3.Row, read_only: bool = False) -> sqlite3.Connection:
+    """Open and configure a new SQLite connection"""
+    if read_only:
+        database, uri = pathlib.Path(DATABASE_FILE).resolve().as_uri() + '?mode=ro', True
+    else:
+        database, uri = DATABASE_FILE, False
+    conn = sqlite3.connect(database, check_same_thread=False, timeout=30,
+                           cached_statements=DB_CACHED_STATEMENTS, uri=uri)
+    conn.row_factory = row_factory
+    apply_pragmas(conn)
+    return conn
+
+def get_writer_conn() -> sqlite3.Connection:
+    """
+    Return the dedicated connection used for batched inserts; callers must
+    hold _writer_lock. Inserts never read rows back, so it has no row factory
+    """
+    global _writer_conn, _last_published_id
+    if _writer_conn is None:
+        _writer_conn = _open_connection(row_factory=None)
+        # Take the write lock when each batch transaction begins so a batch
+        # never has to upgrade a read lock mid-transaction
+        _writer_conn.isolation_level = 'IMMEDIATE'
+        # Live events are published from here on
+        _last_published_id = _writer_conn.execute("SELECT MAX(id) FROM logs").fetchone()[0] or 0
+    return _writer_conn
+
+@contextmanager
+def get_conn():
+    """Borrow a pooled SQLite connection for the duration of a with-block"""
+    try:
+        conn = _db_pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    
+    try:
+        yield conn
+    finally:
+        # Never hand a half-finished transaction to the next borrower
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _db_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# Shared HTTP session for GeoIP lookups - keeps TCP/TLS connections to
+# ipapi.co alive instead of handshaking on every request
+GEO_SESSION = requests.Session()
+GEO_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+))
+
+# GeoIP cache - honeypot traffic is dominated by repeat scanners, so most
+# lookups can be answered without a round trip to ipapi.co
+GEOIP_CACHE_MAXSIZE = 100_000
+GEOIP_CACHE_TTL = 86400  # seconds
+_geoip_cache = OrderedDict()  # ip -> (expires_at, geo_data)
+_geoip_cache_lock = threading.Lock()
+
+# Live event push - each SSE client owns a bounded queue that the insert
+# flusher feeds with newly stored rows, so streams never poll SQLite
+SSE_QUEUE_SIZE = 256
+SSE_KEEPALIVE_INTERVAL = 15  # seconds
+SSE_BACKFILL_BATCH = 100
+SQL_SSE_EVENTS = """
+    SELECT id, timestamp, source_ip, geo_country, action,
+           target_service, ml_score, ml_risk_level, is_anomaly
+    FROM logs
+    WHERE id > ?
+    ORDER BY id ASC
+    LIMIT ?
+"""
+_sse_subscribers = set()
+_sse_lock = threading.Lock()
+_last_published_id = 0  # set when the writer connection opens
+
+# Background GeoIP enrichment - /log stores immediately and queues the
+# lookup so a slow ipapi.co response never stalls ingest
+GEO_QUEUE = queue.Queue(maxsize=10000)  # (log_hash, source_ip)
+GEO_WORKER_COUNT = 4
+GEO_BATCH_SIZE = 64
+
+# Batched ingest - /log appends to a buffer that is written with one
+# executemany per batch, so the WAL commit is shared by many inserts
+INSERT_SQL = '''
+    INSERT INTO logs (
+        timestamp, source_ip, geo_country, geo_city, geo_region,
+        geo_latitude, geo_longitude, geo_timezone, geo_isp, geo_org,
+        protocol, target_service, action, target_file, headers,
+        payload, session_id, user_agent, log_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(log_hash) DO NOTHING
+'''
+INSERT_BATCH_SIZE = 64
+INSERT_FLUSH_INTERVAL = 0.05  # seconds
+INSERT_BUFFER_MAXSIZE = 10000  # logs held in memory if the flusher falls behind
+_pending_logs = []
+_pending_lock = threading.Lock()
+_flush_event = threading.Event()
+
+# Hashes of the most recently stored logs (guarded by _pending_lock), used
+# to drop duplicates before they are buffered; a hash is only added once
+# its row has been committed
+RECENT_HASHES_MAXSIZE = 100_000
+_recent_hashes = OrderedDict()
+
+# Response cache for polled read endpoints - entries are keyed by a data
+# version bumped by this process's own writes (log flushes and GeoIP
+# updates), so those show up on the next poll. Writes it cannot see - other
+# processes, a sqlite shell, ML scoring jobs - may be served stale for up
+# to the endpoint's TTL
+RESPONSE_CACHE_MAXSIZE = 256
+_response_cache = {}  # (endpoint, full_path, data_version) -> (expires_at, body, status)
+_response_cache_lock = threading.Lock()
+_data_version = 0
+
+# Shared read queries - kept as module constants so every endpoint binds the
+# same statement text and hits the sqlite3 statement cache
+# Explicit projection for endpoints that return whole log rows
+LOG_COLUMNS = """
+    id, timestamp, source_ip, geo_country, geo_city, geo_region,
+    geo_latitude, geo_longitude, geo_timezone, geo_isp, geo_org,
+    protocol, target_service, action, target_file, headers, payload,
+    session_id, user_agent, log_hash, ml_score, ml_risk_level,
+    is_anomaly, created_at
+"""
+SQL_TOTAL_LOGS = "SELECT COUNT(*) FROM logs"
+SQL_UNIQUE_IPS = "SELECT COUNT(*) FROM ip_stats WHERE count > 0"
+SQL_AVG_ML_SCORE = "SELECT SUM(sum_score) / SUM(scored) FROM hourly_stats"
+SQL_TOP_COUNTRIES = """
+    SELECT country, count
+    FROM country_stats
+    WHERE country != 'Unknown' AND count > 0
+    ORDER BY count DESC
+    LIMIT 10
+"""
+# Per-IP stats joined with the newest enriched geo row; binds the IP twice
+SQL_INVESTIGATE_SUMMARY = """
+    SELECT s.*, g.*
+    FROM (
+        SELECT
+            COUNT(*) as total_attacks,
+            AVG(ml_score) as avg_score,
+            MAX(ml_score) as max_score,
+            COUNT(DISTINCT action) as unique_actions,
+            COUNT(DISTINCT target_service) as unique_services,
+            MIN(created_at) as first_seen,
+            MAX(created_at) as last_seen
+        FROM logs
+        WHERE source_ip = ?
+    ) s
+    LEFT JOIN (
+        SELECT geo_country, geo_city, geo_region, geo_latitude, geo_longitude, geo_isp
+        FROM logs
+        WHERE source_ip = ? AND geo_country IS NOT NULL
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) g
+"""
+SQL_IP_SCORE_TREND = """
+    SELECT hour, sum_score / scored as avg_score
+    FROM ip_hourly_stats
+    WHERE ip = ? AND scored > 0
+    ORDER BY hour
+"""
+SQL_MAP_POINTS_BY_IP = """
+    SELECT geo_country, geo_city, geo_latitude, geo_longitude,
+           source_ip, COUNT(*) as attack_count,
+           AVG(ml_score) as avg_score
+    FROM logs
+    WHERE geo_latitude IS NOT NULL AND geo_longitude IS NOT NULL
+    GROUP BY geo_country, geo_city, geo_latitude, geo_longitude, source_ip
+"""
+SQL_MAP_POINTS_BY_LOCATION = """
+    SELECT geo_country, geo_city, geo_latitude, geo_longitude,
+           CASE COUNT(DISTINCT source_ip) WHEN 1 THEN MIN(source_ip)
+                ELSE COUNT(DISTINCT source_ip) || ' IPs' END as ip,
+           COUNT(*) as attack_count,
+           AVG(ml_score) as avg_score
+    FROM logs
+    WHERE geo_latitude IS NOT NULL AND geo_longitude IS NOT NULL
+    GROUP BY geo_country, geo_city, geo_latitude, geo_longitude
+"""
+SQL_RECENT_ACTIVITY = "SELECT COUNT(*) FROM logs WHERE created_at >= ?"
+SQL_HOURLY_ATTACKS = """
+    SELECT hour, count
+    FROM hourly_stats
+    WHERE hour >= ? AND count > 0
+    ORDER BY hour
+"""
+SQL_HOURLY_ANOMALY_TREND = """
+    SELECT hour, sum_score / scored as avg_score, scored as count
+    FROM hourly_stats
+    WHERE hour >= ? AND scored > 0
+    ORDER BY hour
+"""
+
+# Rollup tables kept current by triggers on logs, so dashboard aggregates
+# read K summary rows instead of GROUP BY-scanning every log. "scored"
+# counts rows with a non-NULL ml_score so averages match AVG(ml_score).
+ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS country_stats (
+        country TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        sum_score REAL NOT NULL DEFAULT 0,
+        scored INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS hourly_stats (
+        hour TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        sum_score REAL NOT NULL DEFAULT 0,
+        scored INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS ip_stats (
+        ip TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        sum_score REAL NOT NULL DEFAULT 0,
+        scored INTEGER NOT NULL DEFAULT 0,
+        first_seen TEXT,
+        last_seen TEXT
+    );
+    CREATE TABLE IF NOT EXISTS ip_hourly_stats (
+        ip TEXT NOT NULL,
+        hour TEXT NOT NULL,
+        sum_score REAL NOT NULL DEFAULT 0,
+        scored INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (ip, hour)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS action_stats (
+        action TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS service_stats (
+        service TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    );
+    
+    CREATE TRIGGER IF NOT EXISTS logs_rollup_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO country_stats (country, count, sum_score, scored)
+            SELECT NEW.geo_country, 1, COALESCE(NEW.ml_score, 0), NEW.ml_score IS NOT NULL
+            WHERE NEW.geo_country IS NOT NULL
+            ON CONFLICT(country) DO UPDATE SET
+                count = count + 1,
+                sum_score = sum_score + excluded.sum_score,
+                scored = scored + excluded.scored;
+        INSERT INTO hourly_stats (hour, count, sum_score, scored)
+            VALUES (substr(NEW.created_at, 1, 13) || ':00:00', 1,
+                    COALESCE(NEW.ml_score, 0), NEW.ml_score IS NOT NULL)
+            ON CONFLICT(hour) DO UPDATE SET
+                count = count + 1,
+                sum_score = sum_score + excluded.sum_score,
+                scored = scored + excluded.scored;
+        INSERT INTO ip_stats (ip, count, sum_score, scored, first_seen, last_seen)
+            VALUES (NEW.source_ip, 1, COALESCE(NEW.ml_score, 0), NEW.ml_score IS NOT NULL,
+                    NEW.created_at, NEW.created_at)
+            ON CONFLICT(ip) DO UPDATE SET
+                count = count + 1,
+                sum_score = sum_score + excluded.sum_score,
+                scored = scored + excluded.scored,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen);
+    END;
+    
+    -- GeoIP enrichment and ML scoring arrive as UPDATEs after the insert
+    CREATE TRIGGER IF NOT EXISTS logs_rollup_update AFTER UPDATE OF geo_country, ml_score ON logs BEGIN
+        UPDATE country_stats SET
+            count = count - 1,
+            sum_score = sum_score - COALESCE(OLD.ml_score, 0),
+            scored = scored - (OLD.ml_score IS NOT NULL)
+        WHERE country = OLD.geo_country;
+        INSERT INTO country_stats (country, count, sum_score, scored)
+            SELECT NEW.geo_country, 1, COALESCE(NEW.ml_score, 0), NEW.ml_score IS NOT NULL
+            WHERE NEW.geo_country IS NOT NULL
+            ON CONFLICT(country) DO UPDATE SET
+                count = count + 1,
+                sum_score = sum_score + excluded.sum_score,
+                scored = scored + excluded.scored;
+        UPDATE hourly_stats SET
+            sum_score = sum_score - COALESCE(OLD.ml_score, 0) + COALESCE(NEW.ml_score, 0),
+            scored = scored - (OLD.ml_score IS NOT NULL) + (NEW.ml_score IS NOT NULL)
+        WHERE hour = substr(NEW.created_at, 1, 13) || ':00:00';
+        UPDATE ip_stats SET
+            sum_score = sum_score - COALESCE(OLD.ml_score, 0) + COALESCE(NEW.ml_score, 0),
+            scored = scored - (OLD.ml_score IS NOT NULL) + (NEW.ml_score IS NOT NULL)
+        WHERE ip = NEW.source_ip;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS logs_rollup_delete AFTER DELETE ON logs BEGIN
+        UPDATE country_stats SET
+            count = count - 1,
+            sum_score = sum_score - COALESCE(OLD.ml_score, 0),
+            scored = scored - (OLD.ml_score IS NOT NULL)
+        WHERE country = OLD.geo_country;
+        UPDATE hourly_stats SET
+            count = count - 1,
+            sum_score = sum_score - COALESCE(OLD.ml_score, 0),
+            scored = scored - (OLD.ml_score IS NOT NULL)
+        WHERE hour = substr(OLD.created_at, 1, 13) || ':00:00';
+        UPDATE ip_stats SET
+            count = count - 1,
+            sum_score = sum_score - COALESCE(OLD.ml_score, 0),
+            scored = scored - (OLD.ml_score IS NOT NULL)
+        WHERE ip = OLD.source_ip;
+    END;
+    
+    -- action and target_service never change after insert
+    CREATE TRIGGER IF NOT EXISTS logs_label_rollup_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO action_stats (action, count) VALUES (NEW.action, 1)
+            ON CONFLICT(action) DO UPDATE SET count = count + 1;
+        INSERT INTO service_stats (service, count) VALUES (NEW.target_service, 1)
+            ON CONFLICT(service) DO UPDATE SET count = count + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS logs_label_rollup_delete AFTER DELETE ON logs BEGIN
+        UPDATE action_stats SET count = count - 1 WHERE action = OLD.action;
+        UPDATE service_stats SET count = count - 1 WHERE service = OLD.target_service;
+    END;
+    
+    -- Per-IP hourly ML score trend; only scored rows contribute
+    CREATE TRIGGER IF NOT EXISTS logs_ip_hourly_rollup_insert AFTER INSERT ON logs
+    WHEN NEW.ml_score IS NOT NULL BEGIN
+        INSERT INTO ip_hourly_stats (ip, hour, sum_score, scored)
+            VALUES (NEW.source_ip, substr(NEW.created_at, 1, 13) || ':00:00', NEW.ml_score, 1)
+            ON CONFLICT(ip, hour) DO UPDATE SET
+                sum_score = sum_score + excluded.sum_score,
+                scored = scored + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS logs_ip_hourly_rollup_update AFTER UPDATE OF ml_score ON logs BEGIN
+        UPDATE ip_hourly_stats SET
+            sum_score = sum_score - OLD.ml_score,
+            scored = scored - 1
+        WHERE OLD.ml_score IS NOT NULL
+            AND ip = OLD.source_ip AND hour = substr(OLD.created_at, 1, 13) || ':00:00';
+        INSERT INTO ip_hourly_stats (ip, hour, sum_score, scored)
+            SELECT NEW.source_ip, substr(NEW.created_at, 1, 13) || ':00:00', NEW.ml_score, 1
+            WHERE NEW.ml_score IS NOT NULL
+            ON CONFLICT(ip, hour) DO UPDATE SET
+                sum_score = sum_score + excluded.sum_score,
+                scored = scored + 1;
+    END;
+    
+    CREATE TRIGGER IF NOT EXISTS logs_ip_hourly_rollup_delete AFTER DELETE ON logs
+    WHEN OLD.ml_score IS NOT NULL BEGIN
+        UPDATE ip_hourly_stats SET
+            sum_score = sum_score - OLD.ml_score,
+            scored = scored - 1
+        WHERE ip = OLD.source_ip AND hour = substr(OLD.created_at, 1, 13) || ':00:00';
+    END;
+"""
+ROLLUP_TABLES = (
+    'country_stats', 'hourly_stats', 'ip_stats', 'ip_hourly_stats',
+    'action_stats', 'service_stats'
+)
+
+# Backfill for databases that already hold logs when the rollups are added
+ROLLUP_REBUILD = """
+    DELETE FROM country_stats;
+    DELETE FROM hourly_stats;
+    DELETE FROM ip_stats;
+    DELETE FROM ip_hourly_stats;
+    DELETE FROM action_stats;
+    DELETE FROM service_stats;
+    INSERT INTO country_stats (country, count, sum_score, scored)
+        SELECT geo_country, COUNT(*), COALESCE(SUM(ml_score), 0), COUNT(ml_score)
+        FROM logs WHERE geo_country IS NOT NULL GROUP BY geo_country;
+    INSERT INTO hourly_stats (hour, count, sum_score, scored)
+        SELECT substr(created_at, 1, 13) || ':00:00' AS hour, COUNT(*),
+               COALESCE(SUM(ml_score), 0), COUNT(ml_score)
+        FROM logs GROUP BY hour;
+    INSERT INTO ip_stats (ip, count, sum_score, scored, first_seen, last_seen)
+        SELECT source_ip, COUNT(*), COALESCE(SUM(ml_score), 0), COUNT(ml_score),
+               MIN(created_at), MAX(created_at)
+        FROM logs GROUP BY source_ip;
+    INSERT INTO ip_hourly_stats (ip, hour, sum_score, scored)
+        SELECT source_ip, substr(created_at, 1, 13) || ':00:00' AS hour,
+               SUM(ml_score), COUNT(*)
+        FROM logs WHERE ml_score IS NOT NULL GROUP BY source_ip, hour;
+    INSERT INTO action_stats (action, count)
+        SELECT action, COUNT(*) FROM logs GROUP BY action;
+    INSERT INTO service_stats (service, count)
+        SELECT target_service, COUNT(*) FROM logs GROUP BY target_service;
+"""
+
+def created_at_cutoff(hours: int) -> str:
+    """Return the UTC created_at bound for the last N hours as a query parameter"""
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=hours)
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+def hour_cutoff(hours: int) -> str:
+    """Return the hourly_stats bucket containing the cutoff for the last N hours"""
+    return created_at_cutoff(hours)[:13] + ':00:00'
+
+# Bump whenever init_database() gains a migration step
+SCHEMA_VERSION = 7
+
+# Columns added after the original schema, as (name, DDL type)
+ADDED_COLUMNS = (
+    ('ml_score', 'REAL'),
+    ('ml_risk_level', 'TEXT'),
+    ('is_anomaly', 'INTEGER DEFAULT 0'),
+)
+
 def init_database():
     """Initialize the SQLite database with the logs table"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Create logs table with comprehensive schema
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                source_ip TEXT NOT NULL,
-                geo_country TEXT,
-                geo_city TEXT,
-                geo_region TEXT,
-                geo_latitude REAL,
-                geo_longitude REAL,
-                geo_timezone TEXT,
-                geo_isp TEXT,
-                geo_org TEXT,
-                protocol TEXT NOT NULL,
-                target_service TEXT NOT NULL,
-                action TEXT NOT NULL,
-                target_file TEXT,
-                headers TEXT,
-                payload TEXT,
-                session_id TEXT NOT NULL,
-                user_agent TEXT,
-                log_hash TEXT UNIQUE NOT NULL,
-                ml_score REAL,
-                ml_risk_level TEXT,
-                is_anomaly INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Add ML columns if they don't exist (for existing databases)
-        try:
-            cursor.execute('ALTER TABLE logs ADD COLUMN ml_score REAL')
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        try:
-            cursor.execute('ALTER TABLE logs ADD COLUMN ml_risk_level TEXT')
-        except sqlite3.OperationalError:
-            pass
-        try:
-            cursor.execute('ALTER TABLE logs ADD COLUMN is_anomaly INTEGER DEFAULT 0')
-        except sqlite3.OperationalError:
-            pass
-        
-        # Create indexes for better query performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_source_ip ON logs(source_ip)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON logs(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_action ON logs(action)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_target_service ON logs(target_service)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ml_score ON logs(ml_score)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_is_anomaly ON logs(is_anomaly)')
-        
-        conn.commit()
-        conn.close()
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            # Skip migrations entirely once the schema is current
+            user_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if user_version >= SCHEMA_VERSION:
+                logger.info(f"Database initialized: {DATABASE_FILE} (schema v{user_version})")
+                return True
+            
+            # Create logs table with comprehensive schema
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    source_ip TEXT NOT NULL,
+                    geo_country TEXT,
+                    geo_city TEXT,
+                    geo_region TEXT,
+                    geo_latitude REAL,
+                    geo_longitude REAL,
+                    geo_timezone TEXT,
+                    geo_isp TEXT,
+                    geo_org TEXT,
+                    protocol TEXT NOT NULL,
+                    target_service TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    target_file TEXT,
+                    headers TEXT,
+                    payload TEXT,
+                    session_id TEXT NOT NULL,
+                    user_agent TEXT,
+                    log_hash TEXT UNIQUE NOT NULL,
+                    ml_score REAL,
+                    ml_risk_level TEXT,
+                    is_anomaly INTEGER DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Add ML columns if they don't exist (for existing databases)
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(logs)')}
+            for name, ddl in ADDED_COLUMNS:
+                if name not in columns:
+                    cursor.execute(f'ALTER TABLE logs ADD COLUMN {name} {ddl}')
+            
+            # Create indexes for better query performance
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON logs(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_action ON logs(action)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_target_service ON logs(target_service)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_ml_score ON logs(ml_score)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_is_anomaly ON logs(is_anomaly)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON logs(created_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_geo_country ON logs(geo_country)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_ml_score_created ON logs(ml_score, created_at)')
+            # Serves IP lookups and per-IP ORDER BY created_at, and covers every
+            # column of the investigate summary so it never reads table rows
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_source_ip_activity ON logs('
+                           'source_ip, created_at, ml_score, action, target_service)')
+            cursor.execute('DROP INDEX IF EXISTS idx_source_ip_created')
+            cursor.execute('DROP INDEX IF EXISTS idx_source_ip')
+            
+            conn.commit()
+            
+            # Create rollup tables and triggers, backfilling them whenever one is new
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            existing_tables = {row[0] for row in cursor.fetchall()}
+            cursor.executescript(ROLLUP_SCHEMA)
+            if not existing_tables.issuperset(ROLLUP_TABLES):
+                cursor.executescript(ROLLUP_REBUILD)
+                logger.info("Rollup tables built from existing logs")
+            
+            # Refresh planner statistics for the new indexes
+            cursor.execute('ANALYZE')
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
         
         logger.info(f"Database initialized: {DATABASE_FILE}")
         return True
@@ -114,28 +600,162 @@ def init_database():
         logger.error(f"Database initialization failed: {e}")
         return False
 
+# GeoIP data returned for private/local addresses (never looked up)
+PRIVATE_GEOIP_DATA = {
+    'country': 'Private Network',
+    'city': 'Local',
+    'region': 'Private',
+    'latitude': None,
+    'longitude': None,
+    'timezone': 'Local',
+    'isp': 'Private',
+    'org': 'Private Network'
+}
+
+# Known-noise networks (scanners, bogons) loaded from NOISE_NETWORKS_FILE as
+# sorted (start, end, label) integer ranges, with the starts kept for bisect
+_noise_starts = []
+_noise_ranges = []
+
+# Non-routable IPv4 ranges as (network, netmask) integers for a mask-and-compare check
+PRIVATE_NETS = tuple(
+    (int(net.network_address), int(net.netmask))
+    for net in map(ipaddress.IPv4Network, [
+        '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16',
+        '127.0.0.0/8', '169.254.0.0/16', '100.64.0.0/10'
+    ])
+)
+
+def is_private_ip(ip_address: str) -> bool:
+    """Check whether an address is private/local and not worth a GeoIP lookup"""
+    try:
+        ip_int = int(ipaddress.IPv4Address(ip_address))
+    except ValueError:
+        # Not IPv4 - let ipaddress classify IPv6, treat garbage as public
+        try:
+            return ipaddress.ip_address(ip_address).is_private
+        except ValueError:
+            return False
+    
+    return any((ip_int & mask) == net for net, mask in PRIVATE_NETS)
+
+def flatten_noise_ranges(ranges: list) -> list:
+    """
+    Turn (start, end, label) CIDR ranges into sorted, non-overlapping ones.
+    CIDR blocks are either nested or disjoint; an address takes the label of
+    the narrowest block containing it
+    """
+    flat = []
+    enclosing = []  # (end, label) of the blocks containing the cursor, outermost first
+    cursor = 0      # first address not yet assigned to a flat range
+    
+    def close_until(limit):
+        nonlocal cursor
+        while enclosing and enclosing[-1][0] < limit:
+            end, label = enclosing.pop()
+            if cursor <= end:
+                flat.append((cursor, end, label))
+                cursor = end + 1
+    
+    # Broader blocks first when two start at the same address
+    for start, end, label in sorted(ranges, key=lambda r: (r[0], -r[1])):
+        close_until(start)
+        if enclosing and cursor < start:
+            flat.append((cursor, start - 1, enclosing[-1][1]))
+        cursor = start
+        enclosing.append((end, label))
+    close_until(float('inf'))
+    return flat
+
+def load_noise_networks(path: str = NOISE_NETWORKS_FILE) -> int:
+    """Load the known-noise network list into sorted integer ranges"""
+    global _noise_starts, _noise_ranges
+    ranges = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                cidr, *label = line.split(None, 1)
+                try:
+                    net = ipaddress.IPv4Network(cidr, strict=False)
+                except ValueError as e:
+                    logger.warning(f"Skipping {path}:{line_number}: {e}")
+                    continue
+                ranges.append((int(net.network_address), int(net.broadcast_address), label[0] if label else 'Noise'))
+    except FileNotFoundError:
+        return 0
+    
+    # Published scanner lists often nest; flatten so one bisect finds the match
+    _noise_ranges = flatten_noise_ranges(ranges)
+    _noise_starts = [start for start, _, _ in _noise_ranges]
+    logger.info(f"Loaded {len(ranges)} noise networks")
+    return len(ranges)
+
+def noise_network_label(ip_address: str) -> Optional[str]:
+    """Return the label of the known-noise network containing an IPv4 address"""
+    if not _noise_starts:
+        return None
+    try:
+        ip_int = int(ipaddress.IPv4Address(ip_address))
+    except ValueError:
+        return None
+    
+    i = bisect.bisect_right(_noise_starts, ip_int) - 1
+    if i >= 0 and ip_int <= _noise_ranges[i][1]:
+        return _noise_ranges[i][2]
+    return None
+
+def noise_geoip_data(label: str) -> Dict[str, Any]:
+    """GeoIP placeholder for sources in a known-noise network"""
+    return {
+        'country': label,
+        'city': label,
+        'region': label,
+        'latitude': None,
+        'longitude': None,
+        'timezone': 'Unknown',
+        'isp': label,
+        'org': label
+    }
+
 def get_geoip_data(ip_address: str) -> Dict[str, Any]:
     """
     Get GeoIP data for an IP address using ipapi.co
-    Returns enriched geographic information
+    Returns enriched geographic information, served from cache when possible
     """
+    geo_data = get_geoip_data_nowait(ip_address)
+    if geo_data is not None:
+        return geo_data
+    
+    geo_data = _geoip_lookup_uncached(ip_address)
+    if geo_data is None:
+        # Failed lookups are not cached so they get retried next time
+        return get_default_geoip_data()
+    
+    cache_geoip(ip_address, geo_data)
+    return geo_data
+
+def get_geoip_data_nowait(ip_address: str) -> Optional[Dict[str, Any]]:
+    """Return GeoIP data only if it is known without a network lookup"""
+    # Skip GeoIP lookup for private/local IPs
+    if is_private_ip(ip_address):
+        return PRIVATE_GEOIP_DATA
+    
+    # Known scanners/bogons are tagged instead of looked up
+    label = noise_network_label(ip_address)
+    if label is not None:
+        return noise_geoip_data(label)
+    
+    return get_cached_geoip(ip_address)
+
+def _geoip_lookup_uncached(ip_address: str) -> Optional[Dict[str, Any]]:
+    """Query ipapi.co for an IP address, returning None if the lookup fails"""
     try:
-        # Skip GeoIP lookup for private/local IPs
-        if ip_address.startswith(('127.', '192.168.', '10.', '172.')):
-            return {
-                'country': 'Private Network',
-                'city': 'Local',
-                'region': 'Private',
-                'latitude': None,
-                'longitude': None,
-                'timezone': 'Local',
-                'isp': 'Private',
-                'org': 'Private Network'
-            }
-        
         # Use ipapi.co for GeoIP lookup
         url = f"https://ipapi.co/{ip_address}/json/"
-        response = requests.get(url, timeout=10)
+        response = GEO_SESSION.get(url, timeout=10)
         
         if response.status_code == 200:
             geo_data = response.json()
@@ -152,14 +772,89 @@ def get_geoip_data(ip_address: str) -> Dict[str, Any]:
             }
         else:
             logger.warning(f"GeoIP lookup failed for {ip_address}: {response.status_code}")
-            return get_default_geoip_data()
+            return None
             
     except requests.exceptions.RequestException as e:
         logger.warning(f"GeoIP lookup error for {ip_address}: {e}")
-        return get_default_geoip_data()
+        return None
     except Exception as e:
         logger.error(f"Unexpected error in GeoIP lookup for {ip_address}: {e}")
-        return get_default_geoip_data()
+        return None
+
+def get_cached_geoip(ip_address: str) -> Optional[Dict[str, Any]]:
+    """Return cached GeoIP data for an IP, or None if missing or expired"""
+    with _geoip_cache_lock:
+        entry = _geoip_cache.get(ip_address)
+        if entry is None:
+            return None
+        
+        expires_at, geo_data = entry
+        if expires_at < time.time():
+            del _geoip_cache[ip_address]
+            return None
+        
+        _geoip_cache.move_to_end(ip_address)
+        return geo_data
+
+def cache_geoip(ip_address: str, geo_data: Dict[str, Any]) -> None:
+    """Store GeoIP data for an IP, evicting the least recently used entries"""
+    with _geoip_cache_lock:
+        _geoip_cache[ip_address] = (time.time() + GEOIP_CACHE_TTL, geo_data)
+        _geoip_cache.move_to_end(ip_address)
+        while len(_geoip_cache) > GEOIP_CACHE_MAXSIZE:
+            _geoip_cache.popitem(last=False)
+
+def load_geoip_cache() -> int:
+    """Load the persisted GeoIP cache from disk, skipping expired entries"""
+    if not os.path.exists(GEOIP_CACHE_FILE):
+        return 0
+    
+    try:
+        with open(GEOIP_CACHE_FILE, 'r') as f:
+            entries = json.load(f)
+        
+        now = time.time()
+        with _geoip_cache_lock:
+            for ip_address, (expires_at, geo_data) in entries.items():
+                if expires_at >= now:
+                    _geoip_cache[ip_address] = (expires_at, geo_data)
+            loaded = len(_geoip_cache)
+        
+        logger.info(f"Loaded {loaded} cached GeoIP entries from {GEOIP_CACHE_FILE}")
+        return loaded
+        
+    except Exception as e:
+        logger.warning(f"Could not load GeoIP cache: {e}")
+        return 0
+
+def save_geoip_cache() -> None:
+    """Persist the GeoIP cache to disk so restarts don't re-query ipapi.co"""
+    try:
+        with _geoip_cache_lock:
+            entries = dict(_geoip_cache)
+        
+        tmp_file = GEOIP_CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_file, GEOIP_CACHE_FILE)
+        
+        logger.info(f"Saved {len(entries)} GeoIP entries to {GEOIP_CACHE_FILE}")
+        
+    except Exception as e:
+        logger.warning(f"Could not save GeoIP cache: {e}")
+
+def geo_fields(geo_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map GeoIP data onto the geo_* columns of a log entry"""
+    return {
+        'geo_country': geo_data['country'],
+        'geo_city': geo_data['city'],
+        'geo_region': geo_data['region'],
+        'geo_latitude': geo_data['latitude'],
+        'geo_longitude': geo_data['longitude'],
+        'geo_timezone': geo_data['timezone'],
+        'geo_isp': geo_data['isp'],
+        'geo_org': geo_data['org']
+    }
 
 def get_default_geoip_data() -> Dict[str, Any]:
     """Return default GeoIP data when lookup fails"""
@@ -174,26 +869,65 @@ def get_default_geoip_data() -> Dict[str, Any]:
         'org': 'Unknown'
     }
 
+def dump_json_field(value: Any) -> bytes:
+    """Serialize a headers/payload value, using stdlib json for what orjson cannot encode"""
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        # e.g. integers beyond 64 bits
+        return json.dumps(value).encode()
+
+def _parse_json_int(text: str) -> Any:
+    """Parse an integer like orjson does, as a float when it exceeds 64 bits"""
+    value = int(text)
+    return value if -2 ** 63 <= value < 2 ** 64 else float(value)
+
+def load_json_field(text: str) -> Any:
+    """Parse a stored headers/payload value; some rows hold NaN/Infinity"""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # Responses are serialized with orjson, so map the values it cannot encode
+        return json.loads(text, parse_constant=lambda constant: None, parse_int=_parse_json_int)
+
+def serialized_json_fields(log_data: Dict[str, Any]) -> tuple:
+    """
+    Return the headers/payload of a log serialized as JSON bytes, caching them
+    on the dict so hashing and storage share a single serialization
+    """
+    cached = log_data.get('_json_fields')
+    if cached is None:
+        cached = (
+            dump_json_field(log_data.get('headers', {})),
+            dump_json_field(log_data.get('payload', {}))
+        )
+        log_data['_json_fields'] = cached
+    return cached
+
+# Fields that identify a log entry - hashing these instead of the whole
+# re-serialized record keeps the hashed input small and fixed-shape
+LOG_HASH_FIELDS = ('source_ip', 'timestamp', 'session_id', 'protocol', 'action', 'target_service', 'target_file')
+
 def calculate_log_hash(log_data: Dict[str, Any]) -> str:
-    """Calculate SHA256 hash of the log data for integrity checking"""
+    """Calculate SHA256 hash of the identifying log fields for deduplication"""
     try:
-        # Create a copy and remove the hash field if it exists
-        data_copy = log_data.copy()
-        data_copy.pop('log_hash', None)
+        key = '|'.join(str(log_data.get(field) or '') for field in LOG_HASH_FIELDS)
+        payload_len = len(serialized_json_fields(log_data)[1])
+        key_bytes = f"{key}|{payload_len}".encode('utf-8')
         
-        # Sort keys for consistent hashing
-        json_string = json.dumps(data_copy, sort_keys=True, separators=(',', ':'))
-        return hashlib.sha256(json_string.encode('utf-8')).hexdigest()
+        # OpenSSL's SHA256 (SHA-NI accelerated where available); a 128-bit
+        # prefix is plenty for duplicate detection
+        digest = hashlib.sha256(key_bytes, usedforsecurity=False).digest()
+        return digest[:16].hex()
         
     except Exception as e:
         logger.error(f"Error calculating log hash: {e}")
         return "hash_error"
 
 def store_log(log_data: Dict[str, Any]) -> bool:
-    """Store log entry in the database"""
+    """Queue a log entry for the next batched insert into the database"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
+        headers_json, payload_json = serialized_json_fields(log_data)
         
         # Prepare data for insertion
         insert_data = (
@@ -211,35 +945,339 @@ def store_log(log_data: Dict[str, Any]) -> bool:
             log_data.get('target_service'),
             log_data.get('action'),
             log_data.get('target_file'),
-            json.dumps(log_data.get('headers', {})),
-            json.dumps(log_data.get('payload', {})),
+            headers_json.decode(),
+            payload_json.decode(),
             log_data.get('session_id'),
             log_data.get('user_agent'),
             log_data.get('log_hash')
         )
         
-        cursor.execute('''
-            INSERT INTO logs (
-                timestamp, source_ip, geo_country, geo_city, geo_region,
-                geo_latitude, geo_longitude, geo_timezone, geo_isp, geo_org,
-                protocol, target_service, action, target_file, headers,
-                payload, session_id, user_agent, log_hash
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', insert_data)
+        log_hash = insert_data[-1]
+        with _pending_lock:
+            # Duplicates of recent logs (client retries) never reach SQLite;
+            # the UNIQUE log_hash index still catches anything older
+            if log_hash in _recent_hashes:
+                _recent_hashes.move_to_end(log_hash)
+                logger.info(f"Duplicate log ignored: {log_hash}")
+                return True
+            if len(_pending_logs) >= INSERT_BUFFER_MAXSIZE:
+                logger.warning("Insert buffer full, rejecting log")
+                return False
+            
+            _pending_logs.append(insert_data)
+            pending_count = len(_pending_logs)
         
-        conn.commit()
-        conn.close()
+        if pending_count >= INSERT_BATCH_SIZE:
+            _flush_event.set()
         
-        logger.info(f"Log stored successfully: {log_data.get('action')} from {log_data.get('source_ip')}")
+        logger.info(f"Log queued for storage: {log_data.get('action')} from {log_data.get('source_ip')}")
         return True
         
-    except sqlite3.IntegrityError as e:
-        logger.warning(f"Duplicate log entry (hash collision): {e}")
-        return False
     except Exception as e:
         logger.error(f"Database storage error: {e}")
         return False
 
+def load_recent_hashes() -> int:
+    """Seed the recent-hash set from the newest stored logs"""
+    try:
+        with get_conn() as conn:
+            rows = conn.execute(
+                "SELECT log_hash FROM logs ORDER BY id DESC LIMIT ?",
+                (RECENT_HASHES_MAXSIZE,)
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Could not load recent log hashes: {e}")
+        return 0
+    
+    with _pending_lock:
+        # Oldest first so the newest hashes are evicted last
+        for row in reversed(rows):
+            _recent_hashes[row[0]] = None
+    return len(rows)
+
+def flush_pending_logs() -> int:
+    """Write all buffered log entries in a single transaction"""
+    with _pending_lock:
+        batch = _pending_logs[:]
+        _pending_logs.clear()
+    
+    if not batch:
+        return 0
+    
+    try:
+        with _writer_lock:
+            conn = get_writer_conn()
+            # One transaction per batch; duplicate log hashes are skipped by
+            # the ON CONFLICT clause, any other constraint error fails it
+            try:
+                with conn:
+                    conn.executemany(INSERT_SQL, batch)
+                stored = batch
+            except sqlite3.IntegrityError as e:
+                logger.warning(f"Batch insert failed ({e}), retrying {len(batch)} logs one by one")
+                stored = insert_logs_individually(conn, batch)
+            publish_new_events(conn)
+        
+    except sqlite3.Error as e:
+        # Locked or I/O failure - retrying row by row would only wait out the
+        # busy timeout once per row, so keep the batch for the next flush
+        requeue_logs(batch, e)
+        stored = []
+    except Exception as e:
+        logger.error(f"Database storage error, dropped {len(batch)} logs: {e}")
+        stored = []
+    
+    if not stored:
+        return 0
+    
+    # Only hashes that are now in the database count as duplicates, so a
+    # dropped log can still be resent
+    with _pending_lock:
+        for row in stored:
+            _recent_hashes[row[-1]] = None
+            _recent_hashes.move_to_end(row[-1])
+        while len(_recent_hashes) > RECENT_HASHES_MAXSIZE:
+            _recent_hashes.popitem(last=False)
+    
+    bump_data_version()
+    
+    # Rows without GeoIP data can be enriched now that they exist
+    for row in stored:
+        if row[2] is None:
+            enqueue_geo_enrichment(row[-1], row[1])
+    
+    return len(stored)
+
+def requeue_logs(batch: list, error: Exception) -> None:
+    """Put an unwritten batch back at the front of the insert buffer"""
+    with _pending_lock:
+        room = max(INSERT_BUFFER_MAXSIZE - len(_pending_logs), 0)
+        _pending_logs[:0] = batch[:room]
+    
+    logger.warning(f"Batch insert failed ({error}), requeued {min(len(batch), room)} logs")
+    if len(batch) > room:
+        logger.error(f"Insert buffer full, dropped {len(batch) - room} logs: {error}")
+
+def insert_logs_individually(conn: sqlite3.Connection, batch: list) -> list:
+    """
+    Insert rows one transaction at a time so a single bad row only loses
+    itself; returns the rows that were written (or were duplicates).
+    Errors other than constraint violations propagate to the caller
+    """
+    stored = []
+    for row in batch:
+        try:
+            with conn:
+                conn.execute(INSERT_SQL, row)
+            stored.append(row)
+        except sqlite3.IntegrityError as e:
+            logger.error(f"Database storage error, dropped log {row[-1]}: {e}")
+    return stored
+
+def sse_event(row) -> Dict[str, Any]:
+    """Build the SSE event payload for a row selected by SQL_SSE_EVENTS"""
+    event_id, timestamp, source_ip, country, action, service, ml_score, risk_level, is_anomaly = row
+    return {
+        'id': event_id,
+        'timestamp': timestamp,
+        'source_ip': source_ip,
+        'country': country or 'Unknown',
+        'action': action,
+        'service': service,
+        'ml_score': ml_score or 0.0,
+        'risk_level': risk_level or 'UNKNOWN',
+        'is_anomaly': bool(is_anomaly)
+    }
+
+def sse_message(event: Dict[str, Any]) -> bytes:
+    """Encode an event as a complete SSE data frame"""
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+def subscribe_events() -> queue.Queue:
+    """Register a live event queue for an SSE client"""
+    q = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+    with _sse_lock:
+        _sse_subscribers.add(q)
+    return q
+
+def unsubscribe_events(q: queue.Queue) -> None:
+    """Remove an SSE client's event queue"""
+    with _sse_lock:
+        _sse_subscribers.discard(q)
+
+def publish_new_events(conn: sqlite3.Connection) -> None:
+    """
+    Push rows stored since the last publish to every SSE subscriber.
+    Runs on the writer connection right after a batch is committed
+    """
+    global _last_published_id
+    with _sse_lock:
+        subscribers = list(_sse_subscribers)
+    
+    if not subscribers:
+        # Nobody is listening; just move the cursor past the stored rows
+        _last_published_id = conn.execute("SELECT MAX(id) FROM logs").fetchone()[0] or 0
+        return
+    
+    rows = conn.execute(SQL_SSE_EVENTS, (_last_published_id, -1)).fetchall()
+    if not rows:
+        return
+    _last_published_id = rows[-1][0]
+    
+    # Serialize each event once; every subscriber gets the same bytes
+    messages = [(row[0], sse_message(sse_event(row))) for row in rows]
+    for q in subscribers:
+        for message in messages:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # A stalled client loses events rather than blocking inserts
+                break
+
+def _insert_flusher() -> None:
+    """Background thread that flushes buffered logs every few milliseconds"""
+    while True:
+        _flush_event.wait(INSERT_FLUSH_INTERVAL)
+        _flush_event.clear()
+        flush_pending_logs()
+
+threading.Thread(target=_insert_flusher, name='log-flusher', daemon=True).start()
+atexit.register(flush_pending_logs)
+
+def enqueue_geo_enrichment(log_hash: str, ip_address: str) -> None:
+    """Queue a stored log for background GeoIP enrichment"""
+    try:
+        GEO_QUEUE.put_nowait((log_hash, ip_address))
+    except queue.Full:
+        logger.warning(f"GeoIP queue full, leaving {ip_address} unenriched")
+
+def _geo_worker() -> None:
+    """Background worker that resolves queued IPs and updates their logs"""
+    while True:
+        batch = [GEO_QUEUE.get()]
+        while len(batch) < GEO_BATCH_SIZE:
+            try:
+                batch.append(GEO_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+        
+        try:
+            updates = []
+            for log_hash, ip_address in batch:
+                fields = geo_fields(get_geoip_data(ip_address))
+                updates.append((*fields.values(), log_hash))
+            
+            with get_conn() as conn:
+                conn.executemany('''
+                    UPDATE logs SET
+                        geo_country = ?, geo_city = ?, geo_region = ?,
+                        geo_latitude = ?, geo_longitude = ?, geo_timezone = ?,
+                        geo_isp = ?, geo_org = ?
+                    WHERE log_hash = ?
+                ''', updates)
+                conn.commit()
+            
+            bump_data_version()
+                
+        except Exception as e:
+            logger.error(f"GeoIP enrichment error: {e}")
+
+for _ in range(GEO_WORKER_COUNT):
+    threading.Thread(target=_geo_worker, name='geoip-worker', daemon=True).start()
+
+def json_response(payload: Any) -> Response:
+    """Serialize a payload with orjson into an application/json response"""
+    return Response(orjson.dumps(payload), mimetype='application/json')
+
+def iter_json_object(head: Dict[str, Any], list_key: str, items: Iterable[Any],
+                     tail: Optional[Callable[[int], Dict[str, Any]]] = None):
+    """
+    Yield a JSON object built from head, a list_key array serialized one item
+    at a time, and the fields returned by tail(item_count)
+    """
+    yield orjson.dumps(head)[:-1] + (b',' if head else b'') + orjson.dumps(list_key) + b':['
+    
+    count = 0
+    try:
+        for item in items:
+            yield (b',' if count else b'') + orjson.dumps(item)
+            count += 1
+    except Exception as e:
+        # Headers are already sent - close the JSON with an error marker
+        # so clients can tell the list is truncated
+        logger.error(f"Error streaming {list_key}: {e}")
+        yield b'],' + orjson.dumps({'error': str(e)})[1:]
+        return
+    
+    tail_bytes = orjson.dumps(tail(count)) if tail else b'{}'
+    yield b']' + (b',' + tail_bytes[1:] if len(tail_bytes) > 2 else b'}')
+
+def stream_json_response(head: Dict[str, Any], list_key: str, items: Iterable[Any],
+                         tail: Optional[Callable[[int], Dict[str, Any]]] = None) -> Response:
+    """Stream a JSON object whose list is produced lazily, e.g. from a cursor"""
+    return Response(iter_json_object(head, list_key, items, tail), mimetype='application/json')
+
+def parse_log_json_fields(log_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode the stored headers/payload JSON columns of a log row in place"""
+    try:
+        log_dict['headers'] = load_json_field(log_dict['headers']) if log_dict['headers'] else {}
+        log_dict['payload'] = load_json_field(log_dict['payload']) if log_dict['payload'] else {}
+    except ValueError:
+        log_dict['headers'] = {}
+        log_dict['payload'] = {}
+    return log_dict
+
+def _query_rows(query: str, params: Iterable[Any]):
+    """Generator behind iter_query_rows - yields None once the first rows are fetched"""
+    with get_conn() as conn:
+        cursor = conn.execute(query, params)
+        rows = cursor.fetchmany(QUERY_FETCH_SIZE)
+        yield None
+        while rows:
+            yield from rows
+            rows = cursor.fetchmany(QUERY_FETCH_SIZE)
+
+def iter_query_rows(query: str, params: Iterable[Any]):
+    """
+    Iterate a query's rows straight from the cursor, holding a pooled connection.
+    The query runs and its first rows are fetched before this returns, so a
+    SQLite error is raised in the calling view instead of mid-stream.
+    """
+    rows = _query_rows(query, params)
+    next(rows)
+    return rows
+
+def bump_data_version() -> None:
+    """Invalidate cached responses after the logs table changed"""
+    global _data_version
+    with _response_cache_lock:
+        _data_version += 1
+        _response_cache.clear()
+
+def cached_endpoint(ttl: float):
+    """Cache a JSON endpoint's successful responses for up to ttl seconds"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            now = time.time()
+            with _response_cache_lock:
+                key = (view.__name__, request.full_path, _data_version)
+                entry = _response_cache.get(key)
+            
+            if entry is not None and entry[0] > now:
+                return Response(entry[1], status=entry[2], mimetype='application/json')
+            
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                with _response_cache_lock:
+                    if len(_response_cache) >= RESPONSE_CACHE_MAXSIZE:
+                        _response_cache.clear()
+                    _response_cache[key] = (now + ttl, response.get_data(), response.status_code)
+            
+            return response
+        return wrapper
+    return decorator
+
 @app.route('/log', methods=['POST'])
 def receive_log():
     """
@@ -251,49 +1289,42 @@ def receive_log():
         log_data = request.get_json()
         
         if not log_data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return json_response({'error': 'No JSON data provided'}), 400
         
-        # Validate required fields
-        required_fields = ['source_ip', 'action', 'target_service', 'session_id']
+        # Validate required fields - every NOT NULL column of logs, since the
+        # insert itself only happens after the response is sent
+        required_fields = ['timestamp', 'source_ip', 'protocol', 'action', 'target_service', 'session_id']
         for field in required_fields:
-            if field not in log_data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+            if log_data.get(field) is None:
+                return json_response({'error': f'Missing required field: {field}'}), 400
         
-        # Get GeoIP data
+        # Enrich with GeoIP data when it is already known (private or cached);
+        # otherwise store now and let the background workers fill it in
+        # once the row has been flushed
         source_ip = log_data['source_ip']
-        geo_data = get_geoip_data(source_ip)
-        
-        # Enrich log data with GeoIP information
-        log_data.update({
-            'geo_country': geo_data['country'],
-            'geo_city': geo_data['city'],
-            'geo_region': geo_data['region'],
-            'geo_latitude': geo_data['latitude'],
-            'geo_longitude': geo_data['longitude'],
-            'geo_timezone': geo_data['timezone'],
-            'geo_isp': geo_data['isp'],
-            'geo_org': geo_data['org']
-        })
+        geo_data = get_geoip_data_nowait(source_ip)
+        if geo_data is not None:
+            log_data.update(geo_fields(geo_data))
         
         # Calculate integrity hash
         log_data['log_hash'] = calculate_log_hash(log_data)
         
         # Store in database
         if store_log(log_data):
-            return jsonify({
+            return json_response({
                 'status': 'success',
                 'message': 'Log received and stored',
                 'log_id': log_data.get('log_hash', 'unknown')
             }), 200
         else:
-            return jsonify({
+            return json_response({
                 'status': 'error',
                 'message': 'Failed to store log'
             }), 500
             
     except Exception as e:
         logger.error(f"Error processing log: {e}")
-        return jsonify({'error': 'Internal server error'}), 500
+        return json_response({'error': 'Internal server error'}), 500
 
 @app.route('/logs', methods=['GET'])
 def get_logs():
@@ -310,7 +1341,7 @@ def get_logs():
         offset = int(request.args.get('offset', 0))
         
         # Build query
-        query = "SELECT * FROM logs WHERE 1=1"
+        query = f"SELECT {LOG_COLUMNS} FROM logs WHERE 1=1"
         params = []
         
         if source_ip:
@@ -328,101 +1359,65 @@ def get_logs():
         query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
-        # Execute query
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        
-        # Get column names
-        columns = [description[0] for description in cursor.description]
-        
-        # Fetch results
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # Convert to list of dictionaries
-        logs = []
-        for row in rows:
-            log_dict = dict(zip(columns, row))
-            
-            # Parse JSON fields
-            try:
-                log_dict['headers'] = json.loads(log_dict['headers']) if log_dict['headers'] else {}
-                log_dict['payload'] = json.loads(log_dict['payload']) if log_dict['payload'] else {}
-            except json.JSONDecodeError:
-                log_dict['headers'] = {}
-                log_dict['payload'] = {}
-            
-            logs.append(log_dict)
+        # Stream rows from the cursor as they are read, parsing JSON fields
+        logs = (parse_log_json_fields(dict(row)) for row in iter_query_rows(query, params))
         
-        return jsonify({
-            'status': 'success',
-            'logs': logs,
-            'count': len(logs),
-            'limit': limit,
-            'offset': offset
-        }), 200
+        return stream_json_response(
+            {'status': 'success'},
+            'logs',
+            logs,
+            lambda count: {'count': count, 'limit': limit, 'offset': offset}
+        ), 200
         
     except Exception as e:
         logger.error(f"Error retrieving logs: {e}")
-        return jsonify({'error': 'Internal server error'}), 500
+        return json_response({'error': 'Internal server error'}), 500
 
 @app.route('/stats', methods=['GET'])
+@cached_endpoint(5)
 def get_stats():
     """Get honeypot statistics and analytics"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM logs")
-        total_logs = cursor.fetchone()[0]
-        
-        # Get unique IPs
-        cursor.execute("SELECT COUNT(DISTINCT source_ip) FROM logs")
-        unique_ips = cursor.fetchone()[0]
-        
-        # Get top countries
-        cursor.execute("""
-            SELECT geo_country, COUNT(*) as count 
-            FROM logs 
-            WHERE geo_country IS NOT NULL AND geo_country != 'Unknown'
-            GROUP BY geo_country 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_countries = [{'country': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Get top actions
-        cursor.execute("""
-            SELECT action, COUNT(*) as count 
-            FROM logs 
-            GROUP BY action 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_actions = [{'action': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Get top target services
-        cursor.execute("""
-            SELECT target_service, COUNT(*) as count 
-            FROM logs 
-            GROUP BY target_service 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_services = [{'service': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Get recent activity (last 24 hours)
-        cursor.execute("""
-            SELECT COUNT(*) FROM logs 
-            WHERE created_at >= datetime('now', '-1 day')
-        """)
-        recent_activity = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        return jsonify({
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            # Get total count
+            cursor.execute(SQL_TOTAL_LOGS)
+            total_logs = cursor.fetchone()[0]
+            
+            # Get unique IPs
+            cursor.execute(SQL_UNIQUE_IPS)
+            unique_ips = cursor.fetchone()[0]
+            
+            # Get top countries
+            cursor.execute(SQL_TOP_COUNTRIES)
+            top_countries = [{'country': row[0], 'count': row[1]} for row in cursor.fetchall()]
+            
+            # Get top actions
+            cursor.execute("""
+                SELECT action, count
+                FROM action_stats
+                WHERE count > 0
+                ORDER BY count DESC
+                LIMIT 10
+            """)
+            top_actions = [{'action': row[0], 'count': row[1]} for row in cursor.fetchall()]
+            
+            # Get top target services
+            cursor.execute("""
+                SELECT service, count
+                FROM service_stats
+                WHERE count > 0
+                ORDER BY count DESC
+                LIMIT 10
+            """)
+            top_services = [{'service': row[0], 'count': row[1]} for row in cursor.fetchall()]
+            
+            # Get recent activity (last 24 hours)
+            cursor.execute(SQL_RECENT_ACTIVITY, (created_at_cutoff(24),))
+            recent_activity = cursor.fetchone()[0]
+        
+        return json_response({
             'status': 'success',
             'statistics': {
                 'total_logs': total_logs,
@@ -436,20 +1431,19 @@ def get_stats():
         
     except Exception as e:
         logger.error(f"Error getting statistics: {e}")
-        return jsonify({'error': 'Internal server error'}), 500
+        return json_response({'error': 'Internal server error'}), 500
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
         # Check database connectivity
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM logs")
-        log_count = cursor.fetchone()[0]
-        conn.close()
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_TOTAL_LOGS)
+            log_count = cursor.fetchone()[0]
         
-        return jsonify({
+        return json_response({
             'status': 'healthy',
             'service': 'Honeypot Logging Server',
             'timestamp': datetime.datetime.now().isoformat(),
@@ -460,7 +1454,7 @@ def health_check():
         
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return jsonify({
+        return json_response({
             'status': 'unhealthy',
             'error': str(e)
         }), 500
@@ -468,7 +1462,7 @@ def health_check():
 @app.route('/', methods=['GET'])
 def index():
     """Root endpoint - show available endpoints"""
-    return jsonify({
+    return json_response({
         'service': 'Honeypot Logging Server',
         'version': '1.0.0',
         'endpoints': {
@@ -492,13 +1486,13 @@ def index():
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return json_response({'error': 'Endpoint not found'}), 404
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
     logger.error(f"Internal server error: {error}")
-    return jsonify({'error': 'Internal server error'}), 500
+    return json_response({'error': 'Internal server error'}), 500
 
 # ========== NEW ENDPOINTS FOR FRONTEND ==========
 
@@ -529,14 +1523,8 @@ def get_live_events():
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
         
-        conn = sqlite3.connect(DATABASE_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        
-        events = []
-        for row in cursor.fetchall():
-            events.append({
+        events = (
+            {
                 'id': row['id'],
                 'time': row['timestamp'],
                 'ip': row['source_ip'],
@@ -550,82 +1538,69 @@ def get_live_events():
                 'risk_level': row['ml_risk_level'] or 'UNKNOWN',
                 'is_anomaly': bool(row['is_anomaly']),
                 'user_agent': row['user_agent']
-            })
+            }
+            for row in iter_query_rows(query, params)
+        )
         
-        conn.close()
-        return jsonify({'events': events, 'count': len(events)}), 200
+        return stream_json_response({}, 'events', events, lambda count: {'count': count}), 200
         
     except Exception as e:
         logger.error(f"Error getting live events: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @app.route('/api/analytics', methods=['GET'])
+@cached_endpoint(5)
 def get_analytics():
     """Get analytics data for Analytics page"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Total attacks
-        cursor.execute("SELECT COUNT(*) FROM logs")
-        total_attacks = cursor.fetchone()[0]
-        
-        # High-risk attacks (score >= 0.8)
-        cursor.execute("SELECT COUNT(*) FROM logs WHERE ml_score >= 0.8")
-        high_risk = cursor.fetchone()[0]
-        
-        # Unique IPs
-        cursor.execute("SELECT COUNT(DISTINCT source_ip) FROM logs")
-        unique_ips = cursor.fetchone()[0]
-        
-        # Average ML score
-        cursor.execute("SELECT AVG(ml_score) FROM logs WHERE ml_score IS NOT NULL")
-        avg_score = cursor.fetchone()[0] or 0.0
-        
-        # Top countries
-        cursor.execute("""
-            SELECT geo_country, COUNT(*) as count 
-            FROM logs 
-            WHERE geo_country IS NOT NULL AND geo_country != 'Unknown'
-            GROUP BY geo_country 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_countries = [{'country': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Top ports (from protocol)
-        cursor.execute("""
-            SELECT protocol, COUNT(*) as count 
-            FROM logs 
-            GROUP BY protocol 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_ports = [{'port': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Top IPs by attack count
-        cursor.execute("""
-            SELECT source_ip, COUNT(*) as count 
-            FROM logs 
-            GROUP BY source_ip 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_ips = [{'ip': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # Attacks over time (last 24 hours, hourly)
-        cursor.execute("""
-            SELECT strftime('%Y-%m-%d %H:00:00', created_at) as hour, COUNT(*) as count
-            FROM logs
-            WHERE created_at >= datetime('now', '-24 hours')
-            GROUP BY hour
-            ORDER BY hour
-        """)
-        time_series = [{'time': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            # Total attacks
+            cursor.execute(SQL_TOTAL_LOGS)
+            total_attacks = cursor.fetchone()[0]
+            
+            # High-risk attacks (score >= 0.8)
+            cursor.execute("SELECT COUNT(*) FROM logs WHERE ml_score >= 0.8")
+            high_risk = cursor.fetchone()[0]
+            
+            # Unique IPs
+            cursor.execute(SQL_UNIQUE_IPS)
+            unique_ips = cursor.fetchone()[0]
+            
+            # Average ML score
+            cursor.execute(SQL_AVG_ML_SCORE)
+            avg_score = cursor.fetchone()[0] or 0.0
+            
+            # Top countries
+            cursor.execute(SQL_TOP_COUNTRIES)
+            top_countries = [{'country': row[0], 'count': row[1]} for row in cursor.fetchall()]
+            
+            # Top ports (from protocol)
+            cursor.execute("""
+                SELECT protocol, COUNT(*) as count 
+                FROM logs 
+                GROUP BY protocol 
+                ORDER BY count DESC 
+                LIMIT 10
+            """)
+            top_ports = [{'port': row[0], 'count': row[1]} for row in cursor.fetchall()]
+            
+            # Top IPs by attack count
+            cursor.execute("""
+                SELECT ip, count
+                FROM ip_stats
+                WHERE count > 0
+                ORDER BY count DESC
+                LIMIT 10
+            """)
+            top_ips = [{'ip': row[0], 'count': row[1]} for row in cursor.fetchall()]
+            
+            # Attacks over time (last 24 hours, hourly)
+            cursor.execute(SQL_HOURLY_ATTACKS, (hour_cutoff(24),))
+            time_series = [{'time': row[0], 'count': row[1]} for row in cursor.fetchall()]
+        
+        return json_response({
             'total_attacks': total_attacks,
             'high_risk_attacks': high_risk,
             'unique_ips': unique_ips,
@@ -638,125 +1613,110 @@ def get_analytics():
         
     except Exception as e:
         logger.error(f"Error getting analytics: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @app.route('/api/map-data', methods=['GET'])
+@cached_endpoint(5)
 def get_map_data():
     """Get geographic data for Map View"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Get all logs with coordinates
-        cursor.execute("""
-            SELECT geo_country, geo_city, geo_latitude, geo_longitude, 
-                   source_ip, COUNT(*) as attack_count,
-                   AVG(ml_score) as avg_score
-            FROM logs
-            WHERE geo_latitude IS NOT NULL AND geo_longitude IS NOT NULL
-            GROUP BY geo_country, geo_city, geo_latitude, geo_longitude, source_ip
-        """)
-        
-        map_points = []
-        for row in cursor.fetchall():
-            map_points.append({
-                'country': row[0] or 'Unknown',
-                'city': row[1] or 'Unknown',
-                'lat': row[2],
-                'lng': row[3],
-                'ip': row[4],
-                'attack_count': row[5],
-                'avg_score': round(row[6] or 0.0, 2)
-            })
-        
-        # Country aggregation
-        cursor.execute("""
-            SELECT geo_country, COUNT(*) as count, AVG(ml_score) as avg_score
-            FROM logs
-            WHERE geo_country IS NOT NULL AND geo_country != 'Unknown'
-            GROUP BY geo_country
-            ORDER BY count DESC
-        """)
-        
-        country_stats = []
-        for row in cursor.fetchall():
-            country_stats.append({
-                'country': row[0],
-                'count': row[1],
-                'avg_score': round(row[2] or 0.0, 2)
-            })
-        
-        conn.close()
-        
-        return jsonify({
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            # Points are per attacker IP by default; ?group=location folds
+            # them into one point per coordinate for zoomed-out views
+            if request.args.get('group') == 'location':
+                cursor.execute(SQL_MAP_POINTS_BY_LOCATION)
+            else:
+                cursor.execute(SQL_MAP_POINTS_BY_IP)
+            
+            map_points = [
+                {
+                    'country': country or 'Unknown',
+                    'city': city or 'Unknown',
+                    'lat': lat,
+                    'lng': lng,
+                    'ip': ip,
+                    'attack_count': attack_count,
+                    'avg_score': round(avg_score or 0.0, 2)
+                }
+                for country, city, lat, lng, ip, attack_count, avg_score in cursor
+            ]
+            
+            # Country aggregation
+            cursor.execute("""
+                SELECT country, count, sum_score / scored as avg_score
+                FROM country_stats
+                WHERE country != 'Unknown' AND count > 0
+                ORDER BY count DESC
+            """)
+            
+            country_stats = []
+            for row in cursor.fetchall():
+                country_stats.append({
+                    'country': row[0],
+                    'count': row[1],
+                    'avg_score': round(row[2] or 0.0, 2)
+                })
+        
+        return json_response({
             'points': map_points,
             'country_stats': country_stats
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting map data: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @app.route('/api/ml-insights', methods=['GET'])
+@cached_endpoint(5)
 def get_ml_insights():
     """Get ML insights data"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Average anomaly score
-        cursor.execute("SELECT AVG(ml_score) FROM logs WHERE ml_score IS NOT NULL")
-        avg_score = cursor.fetchone()[0] or 0.0
-        
-        # High-score IPs
-        cursor.execute("""
-            SELECT source_ip, AVG(ml_score) as avg_score, COUNT(*) as count
-            FROM logs
-            WHERE ml_score IS NOT NULL
-            GROUP BY source_ip
-            HAVING avg_score >= 0.8
-            ORDER BY avg_score DESC
-            LIMIT 10
-        """)
-        high_score_ips = [
-            {'ip': row[0], 'avg_score': round(row[1], 4), 'count': row[2]}
-            for row in cursor.fetchall()
-        ]
-        
-        # Anomaly trend over time
-        cursor.execute("""
-            SELECT strftime('%Y-%m-%d %H:00:00', created_at) as hour,
-                   AVG(ml_score) as avg_score,
-                   COUNT(*) as count
-            FROM logs
-            WHERE created_at >= datetime('now', '-24 hours') AND ml_score IS NOT NULL
-            GROUP BY hour
-            ORDER BY hour
-        """)
-        anomaly_trend = [
-            {'time': row[0], 'avg_score': round(row[1], 4), 'count': row[2]}
-            for row in cursor.fetchall()
-        ]
-        
-        # Risk level distribution
-        cursor.execute("""
-            SELECT ml_risk_level, COUNT(*) as count
-            FROM logs
-            WHERE ml_risk_level IS NOT NULL
-            GROUP BY ml_risk_level
-        """)
-        risk_distribution = [
-            {'risk_level': row[0], 'count': row[1]}
-            for row in cursor.fetchall()
-        ]
-        
-        # Anomaly count
-        cursor.execute("SELECT COUNT(*) FROM logs WHERE is_anomaly = 1")
-        anomaly_count = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        return jsonify({
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            # Average anomaly score
+            cursor.execute(SQL_AVG_ML_SCORE)
+            avg_score = cursor.fetchone()[0] or 0.0
+            
+            # High-score IPs
+            cursor.execute("""
+                SELECT ip, sum_score / scored as avg_score, scored as count
+                FROM ip_stats
+                WHERE scored > 0 AND sum_score / scored >= 0.8
+                ORDER BY avg_score DESC
+                LIMIT 10
+            """)
+            high_score_ips = [
+                {'ip': row[0], 'avg_score': round(row[1], 4), 'count': row[2]}
+                for row in cursor.fetchall()
+            ]
+            
+            # Anomaly trend over time
+            cursor.execute(SQL_HOURLY_ANOMALY_TREND, (hour_cutoff(24),))
+            anomaly_trend = [
+                {'time': row[0], 'avg_score': round(row[1], 4), 'count': row[2]}
+                for row in cursor.fetchall()
+            ]
+            
+            # Risk level distribution
+            cursor.execute("""
+                SELECT ml_risk_level, COUNT(*) as count
+                FROM logs
+                WHERE ml_risk_level IS NOT NULL
+                GROUP BY ml_risk_level
+            """)
+            risk_distribution = [
+                {'risk_level': row[0], 'count': row[1]}
+                for row in cursor.fetchall()
+            ]
+            
+            # Anomaly count
+            cursor.execute("SELECT COUNT(*) FROM logs WHERE is_anomaly = 1")
+            anomaly_count = cursor.fetchone()[0]
+        
+        return json_response({
             'avg_anomaly_score': round(avg_score, 4),
             'high_score_ips': high_score_ips,
             'anomaly_trend': anomaly_trend,
@@ -766,7 +1726,7 @@ def get_ml_insights():
         
     except Exception as e:
         logger.error(f"Error getting ML insights: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
@@ -775,184 +1735,168 @@ def get_alerts():
         threshold = float(request.args.get('threshold', 0.85))
         limit = int(request.args.get('limit', 50))
         
-        conn = sqlite3.connect(DATABASE_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, timestamp, source_ip, geo_country, action, 
-                   target_service, ml_score, ml_risk_level, target_file
-            FROM logs
-            WHERE ml_score >= ? OR is_anomaly = 1
-            ORDER BY ml_score DESC, created_at DESC
-            LIMIT ?
-        """, (threshold, limit))
-        
-        alerts = []
-        for row in cursor.fetchall():
-            alerts.append({
-                'id': row['id'],
-                'timestamp': row['timestamp'],
-                'source_ip': row['source_ip'],
-                'country': row['geo_country'] or 'Unknown',
-                'action': row['action'],
-                'service': row['target_service'],
-                'score': round(row['ml_score'] or 0.0, 4),
-                'risk_level': row['ml_risk_level'] or 'HIGH',
-                'target_file': row['target_file']
-            })
-        
-        conn.close()
-        return jsonify({'alerts': alerts, 'count': len(alerts)}), 200
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT id, timestamp, source_ip, geo_country, action, 
+                       target_service, ml_score, ml_risk_level, target_file
+                FROM logs
+                WHERE ml_score >= ? OR is_anomaly = 1
+                ORDER BY ml_score DESC, created_at DESC
+                LIMIT ?
+            """, (threshold, limit))
+            
+            alerts = []
+            for row in cursor.fetchall():
+                alerts.append({
+                    'id': row['id'],
+                    'timestamp': row['timestamp'],
+                    'source_ip': row['source_ip'],
+                    'country': row['geo_country'] or 'Unknown',
+                    'action': row['action'],
+                    'service': row['target_service'],
+                    'score': round(row['ml_score'] or 0.0, 4),
+                    'risk_level': row['ml_risk_level'] or 'HIGH',
+                    'target_file': row['target_file']
+                })
+        
+        return json_response({'alerts': alerts, 'count': len(alerts)}), 200
         
     except Exception as e:
         logger.error(f"Error getting alerts: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @app.route('/api/investigate/<ip>', methods=['GET'])
 def investigate_ip(ip):
     """Get detailed investigation data for a specific IP"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get all logs for this IP
-        cursor.execute("""
-            SELECT * FROM logs
-            WHERE source_ip = ?
-            ORDER BY created_at DESC
-            LIMIT 100
-        """, (ip,))
-        
-        logs = []
-        for row in cursor.fetchall():
-            log_dict = dict(row)
-            try:
-                log_dict['headers'] = json.loads(log_dict['headers']) if log_dict['headers'] else {}
-                log_dict['payload'] = json.loads(log_dict['payload']) if log_dict['payload'] else {}
-            except:
-                log_dict['headers'] = {}
-                log_dict['payload'] = {}
-            logs.append(log_dict)
-        
-        # Get statistics
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_attacks,
-                AVG(ml_score) as avg_score,
-                MAX(ml_score) as max_score,
-                COUNT(DISTINCT action) as unique_actions,
-                COUNT(DISTINCT target_service) as unique_services
-            FROM logs
-            WHERE source_ip = ?
-        """, (ip,))
-        
-        stats_row = cursor.fetchone()
-        stats = {
-            'total_attacks': stats_row['total_attacks'],
-            'avg_score': round(stats_row['avg_score'] or 0.0, 4),
-            'max_score': round(stats_row['max_score'] or 0.0, 4),
-            'unique_actions': stats_row['unique_actions'],
-            'unique_services': stats_row['unique_services']
-        }
-        
-        # Get first seen / last seen
-        cursor.execute("""
-            SELECT MIN(created_at) as first_seen, MAX(created_at) as last_seen
-            FROM logs
-            WHERE source_ip = ?
-        """, (ip,))
-        
-        time_row = cursor.fetchone()
-        stats['first_seen'] = time_row['first_seen']
-        stats['last_seen'] = time_row['last_seen']
-        
-        # Get geo info
-        cursor.execute("""
-            SELECT geo_country, geo_city, geo_region, geo_latitude, geo_longitude, geo_isp
-            FROM logs
-            WHERE source_ip = ?
-            LIMIT 1
-        """, (ip,))
-        
-        geo_row = cursor.fetchone()
-        geo_info = {
-            'country': geo_row['geo_country'] if geo_row else None,
-            'city': geo_row['geo_city'] if geo_row else None,
-            'region': geo_row['geo_region'] if geo_row else None,
-            'latitude': geo_row['geo_latitude'] if geo_row else None,
-            'longitude': geo_row['geo_longitude'] if geo_row else None,
-            'isp': geo_row['geo_isp'] if geo_row else None
-        }
-        
-        # Get ML score trend
-        cursor.execute("""
-            SELECT strftime('%Y-%m-%d %H:00:00', created_at) as hour,
-                   AVG(ml_score) as avg_score
-            FROM logs
-            WHERE source_ip = ? AND ml_score IS NOT NULL
-            GROUP BY hour
-            ORDER BY hour
-        """, (ip,))
-        
-        score_trend = [
-            {'time': row[0], 'score': round(row[1], 4)}
-            for row in cursor.fetchall()
-        ]
-        
-        conn.close()
-        
-        return jsonify({
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            
+            # Get statistics, first seen / last seen and geo info in one round-trip
+            cursor.execute(SQL_INVESTIGATE_SUMMARY, (ip, ip))
+            
+            (total_attacks, avg_score, max_score, unique_actions, unique_services,
+             first_seen, last_seen, country, city, region, latitude, longitude,
+             isp) = cursor.fetchone()
+            stats = {
+                'total_attacks': total_attacks,
+                'avg_score': round(avg_score or 0.0, 4),
+                'max_score': round(max_score or 0.0, 4),
+                'unique_actions': unique_actions,
+                'unique_services': unique_services,
+                'first_seen': first_seen,
+                'last_seen': last_seen
+            }
+            geo_info = {
+                'country': country,
+                'city': city,
+                'region': region,
+                'latitude': latitude,
+                'longitude': longitude,
+                'isp': isp
+            }
+            
+            # Get ML score trend as parallel time/score arrays for charting
+            cursor.execute(SQL_IP_SCORE_TREND, (ip,))
+            
+            score_trend_time = []
+            score_trend_score = []
+            for hour, score in cursor:
+                score_trend_time.append(hour)
+                score_trend_score.append(round(score, 4))
+        
+        # Stream the (largest) per-log section straight from the cursor
+        logs = (
+            parse_log_json_fields(dict(row))
+            for row in iter_query_rows(f"""
+                SELECT {LOG_COLUMNS} FROM logs
+                WHERE source_ip = ?
+                ORDER BY created_at DESC
+                LIMIT 100
+            """, (ip,))
+        )
+        
+        return stream_json_response({
             'ip': ip,
             'stats': stats,
             'geo_info': geo_info,
-            'logs': logs,
-            'score_trend': score_trend
-        }), 200
+            'score_trend_time': score_trend_time,
+            'score_trend_score': score_trend_score
+        }, 'logs', logs), 200
         
     except Exception as e:
         logger.error(f"Error investigating IP {ip}: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @app.route('/api/events-stream', methods=['GET'])
 def events_stream():
     """Server-Sent Events stream for real-time updates"""
-    def generate():
-        last_id = int(request.args.get('last_id', 0))
-        while True:
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, timestamp, source_ip, geo_country, action, 
-                       target_service, ml_score, ml_risk_level, is_anomaly
-                FROM logs
-                WHERE id > ?
-                ORDER BY id ASC
-                LIMIT 10
-            """, (last_id,))
-            
-            events = cursor.fetchall()
-            conn.close()
-            
-            for event in events:
-                last_id = event[0]
-                data = {
-                    'id': event[0],
-                    'timestamp': event[1],
-                    'source_ip': event[2],
-                    'country': event[3] or 'Unknown',
-                    'action': event[4],
-                    'service': event[5],
-                    'ml_score': event[6] or 0.0,
-                    'risk_level': event[7] or 'UNKNOWN',
-                    'is_anomaly': bool(event[8])
-                }
-                yield f"data: {json.dumps(data)}\n\n"
+    # Only replay history a client explicitly asks for; a fresh connection
+    # starts with the next new event
+    last_id = request.args.get('last_id', type=int)
+    
+    def generate(last_id):
+        # Subscribe before backfilling so no row falls between the two;
+        # anything seen twice is skipped by id
+        events = subscribe_events()
+        try:
+            # Catch up on rows after last_id, then switch to pushed events
+            conn = _open_connection(read_only=True)
+            try:
+                if last_id is None:
+                    last_id = conn.execute("SELECT MAX(id) FROM logs").fetchone()[0] or 0
+                while True:
+                    sent = 0
+                    for row in conn.execute(SQL_SSE_EVENTS, (last_id, SSE_BACKFILL_BATCH)):
+                        event = sse_event(row)
+                        last_id = event['id']
+                        sent += 1
+                        yield sse_message(event)
+                    if sent < SSE_BACKFILL_BATCH:
+                        break
+            finally:
+                conn.close()
             
-            time.sleep(2)  # Check every 2 seconds
+            while True:
+                try:
+                    event_id, message = events.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                
+                if event_id > last_id:
+                    last_id = event_id
+                    yield message
+        finally:
+            unsubscribe_events(events)
     
-    return Response(generate(), mimetype='text/event-stream')
+    return Response(generate(last_id), mimetype='text/event-stream')
+
+def hash_backend() -> str:
+    """Describe which implementation backs hashlib.sha256"""
+    try:
+        import _hashlib
+        if hasattr(_hashlib, 'openssl_sha256'):
+            return "OpenSSL"
+    except ImportError:
+        pass
+    return "builtin (no OpenSSL)"
+
+def prepare_server() -> bool:
+    """Initialize the database and warm caches before serving requests"""
+    if not init_database():
+        return False
+    
+    # Warm the in-memory lookups and persist the GeoIP cache again on shutdown
+    load_noise_networks()
+    load_geoip_cache()
+    load_recent_hashes()
+    atexit.register(save_geoip_cache)
+    
+    logger.info(f"Log hash backend: {hash_backend()}")
+    return True
 
 def main():
     """Main application entry point"""
@@ -960,7 +1904,7 @@ def main():
     print("=" * 50)
     
     # Initialize database
-    if not init_database():
+    if not prepare_server():
         print("❌ Failed to initialize database. Exiting.")
         return
     
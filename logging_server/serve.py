@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+gevent entrypoint for the Logging Server
+Serves the same Flask app on cooperative greenlets instead of OS threads
+"""
+
+# Must run before anything imports socket/ssl/threading
+from gevent import monkey
+monkey.patch_all()
+
+import gevent.pool
+from gevent.pywsgi import WSGIServer
+
+from logging_server import app, prepare_server
+
+HOST = '0.0.0.0'
+PORT = 5000
+MAX_CONNECTIONS = 1000
+
+def main():
+    """Start the logging server under gevent's WSGI server"""
+    print("📊 Starting Honeypot Logging Server (gevent)...")
+    print("=" * 50)
+    
+    if not prepare_server():
+        print("❌ Failed to initialize database. Exiting.")
+        return
+    
+    print("✅ Database initialized successfully")
+    print(f"🚀 Serving on {HOST}:{PORT} with up to {MAX_CONNECTIONS} concurrent connections")
+    print("=" * 50)
+    
+    server = WSGIServer((HOST, PORT), app, spawn=gevent.pool.Pool(MAX_CONNECTIONS))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Logging server stopped by user")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the Logging Server storage layer
+Covers duplicate handling, required-field validation, rollup triggers and
+schema migration against throwaway SQLite databases
+"""
+
+import os
+import sys
+import json
+import math
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import logging_server as ls
+
+# Rollup columns compared against a full recompute; ip_stats first/last seen
+# are not maintained on delete, and emptied groups linger with a zero count
+ROLLUP_QUERIES = {
+    'country_stats': "SELECT country, count, ROUND(sum_score, 6), scored FROM country_stats WHERE count > 0",
+    'hourly_stats': "SELECT hour, count, ROUND(sum_score, 6), scored FROM hourly_stats WHERE count > 0",
+    'ip_stats': "SELECT ip, count, ROUND(sum_score, 6), scored FROM ip_stats WHERE count > 0",
+    'ip_hourly_stats': "SELECT ip, hour, ROUND(sum_score, 6), scored FROM ip_hourly_stats WHERE scored > 0",
+    'action_stats': "SELECT action, count FROM action_stats WHERE count > 0",
+    'service_stats': "SELECT service, count FROM service_stats WHERE count > 0",
+}
+
+# The logs table as created before the ML columns and rollups existed
+LEGACY_SCHEMA = '''
+    CREATE TABLE logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        source_ip TEXT NOT NULL,
+        geo_country TEXT,
+        geo_city TEXT,
+        geo_region TEXT,
+        geo_latitude REAL,
+        geo_longitude REAL,
+        geo_timezone TEXT,
+        geo_isp TEXT,
+        geo_org TEXT,
+        protocol TEXT NOT NULL,
+        target_service TEXT NOT NULL,
+        action TEXT NOT NULL,
+        target_file TEXT,
+        headers TEXT,
+        payload TEXT,
+        session_id TEXT NOT NULL,
+        user_agent TEXT,
+        log_hash TEXT UNIQUE NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+def make_log(index: int, **overrides):
+    """Build a complete log payload from a private address (no GeoIP lookups)"""
+    log = {
+        'timestamp': f'2024-01-01T00:00:{index:02d}',
+        'source_ip': f'192.168.1.{index % 3 + 1}',
+        'protocol': 'HTTP',
+        'action': 'file_access' if index % 2 else 'login_attempt',
+        'target_service': 'Fake Git Repository',
+        'target_file': '.env',
+        'session_id': f'session-{index}',
+        'payload': {'n': index},
+    }
+    log.update(overrides)
+    return log
+
+def use_database(path: str) -> None:
+    """Point the server at a fresh database file, dropping every open connection"""
+    ls.flush_pending_logs()
+    with ls._writer_lock:
+        if ls._writer_conn is not None:
+            ls._writer_conn.close()
+            ls._writer_conn = None
+    while True:
+        try:
+            ls._db_pool.get_nowait().close()
+        except ls.queue.Empty:
+            break
+    with ls._pending_lock:
+        ls._recent_hashes.clear()
+    ls.DATABASE_FILE = path
+    ls.GEOIP_CACHE_FILE = os.path.join(os.path.dirname(path), 'geoip_cache.json')
+    ls.bump_data_version()
+
+def rollup_snapshot(conn: sqlite3.Connection):
+    """Return the comparable contents of every rollup table"""
+    return {
+        table: sorted(conn.execute(query).fetchall())
+        for table, query in ROLLUP_QUERIES.items()
+    }
+
+class LoggingServerTestCase(unittest.TestCase):
+    """Runs each test against its own temporary database"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'honeypot.db')
+        self.client = ls.app.test_client()
+
+    def tearDown(self):
+        use_database(os.path.join(self.tmpdir, 'closed.db'))
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def open_database(self):
+        use_database(self.db_path)
+        self.assertTrue(ls.init_database())
+
+    def post_log(self, log):
+        return self.client.post('/log', json=log)
+
+    def query(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+class TestLogIngest(LoggingServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.open_database()
+
+    def test_duplicate_post_stored_once(self):
+        log = make_log(1)
+        self.assertEqual(self.post_log(log).status_code, 200)
+        ls.flush_pending_logs()
+        # A retry after the first copy was committed, and one still buffered
+        self.assertEqual(self.post_log(log).status_code, 200)
+        self.assertEqual(self.post_log(make_log(2)).status_code, 200)
+        self.assertEqual(self.post_log(make_log(2)).status_code, 200)
+        ls.flush_pending_logs()
+
+        self.assertEqual(self.query("SELECT COUNT(*) FROM logs")[0][0], 2)
+
+    def test_missing_required_field_rejected(self):
+        for field in ('timestamp', 'source_ip', 'protocol', 'action', 'target_service', 'session_id'):
+            with self.subTest(field=field):
+                log = make_log(3)
+                del log[field]
+                response = self.post_log(log)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.get_json()['error'])
+
+        ls.flush_pending_logs()
+        self.assertEqual(self.query("SELECT COUNT(*) FROM logs")[0][0], 0)
+
+    def test_non_finite_and_big_number_payload_stored(self):
+        # Sent the way honeypots forward attacker data, via stdlib json
+        log = make_log(8, payload={'score': float('nan'), 'big': 2 ** 70, 'inf': float('inf')})
+        response = self.client.post('/log', data=json.dumps(log), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        ls.flush_pending_logs()
+
+        payload = json.loads(self.query("SELECT payload FROM logs")[0][0])
+        self.assertTrue(math.isnan(payload['score']))
+        self.assertEqual(payload['big'], 2 ** 70)
+
+        logs = self.client.get('/logs').get_json()['logs']
+        self.assertEqual(len(logs), 1)
+        self.assertIsNone(logs[0]['payload']['inf'])
+
+    def test_bad_row_does_not_drop_batch(self):
+        ls.store_log({**make_log(4), 'log_hash': 'good-1'})
+        ls.store_log({**make_log(5), 'protocol': None, 'log_hash': 'bad'})
+        ls.store_log({**make_log(6), 'log_hash': 'good-2'})
+
+        ls.flush_pending_logs()
+        self.assertEqual(
+            sorted(row[0] for row in self.query("SELECT log_hash FROM logs")),
+            ['good-1', 'good-2']
+        )
+        # Only committed rows count as seen, so a fixed resend is stored
+        self.assertNotIn('bad', ls._recent_hashes)
+        ls.store_log({**make_log(5), 'log_hash': 'bad'})
+        ls.flush_pending_logs()
+        self.assertEqual(self.query("SELECT COUNT(*) FROM logs")[0][0], 3)
+
+    def test_locked_database_keeps_batch(self):
+        writer = ls.get_writer_conn()
+        writer.execute("PRAGMA busy_timeout = 50")
+        blocker = sqlite3.connect(self.db_path)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            ls.store_log({**make_log(9), 'log_hash': 'locked-1'})
+            ls.store_log({**make_log(10), 'log_hash': 'locked-2'})
+            self.assertEqual(ls.flush_pending_logs(), 0)
+        finally:
+            blocker.rollback()
+            blocker.close()
+
+        # The batch is retried (by this flush or the background flusher) once the lock clears
+        deadline = time.monotonic() + 5
+        while self.query("SELECT COUNT(*) FROM logs")[0][0] < 2 and time.monotonic() < deadline:
+            ls.flush_pending_logs()
+            time.sleep(0.05)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM logs")[0][0], 2)
+
+    def test_rollups_match_recompute(self):
+        for index in range(12):
+            self.assertEqual(self.post_log(make_log(index)).status_code, 200)
+        ls.flush_pending_logs()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            steps = (
+                ("UPDATE logs SET ml_score = id / 10.0 WHERE id % 2 = 0", ()),
+                ("UPDATE logs SET ml_score = 0.95 WHERE id = 2", ()),
+                ("UPDATE logs SET ml_score = NULL WHERE id = 4", ()),
+                ("UPDATE logs SET geo_country = 'Elsewhere' WHERE id IN (1, 6)", ()),
+                ("DELETE FROM logs WHERE id IN (3, 8)", ()),
+            )
+            for sql, params in steps:
+                with self.subTest(step=sql):
+                    conn.execute(sql, params)
+                    conn.commit()
+
+                    expected = sqlite3.connect(':memory:')
+                    conn.backup(expected)
+                    expected.executescript(ls.ROLLUP_REBUILD)
+                    self.assertEqual(rollup_snapshot(conn), rollup_snapshot(expected))
+                    expected.close()
+        finally:
+            conn.close()
+
+class TestNoiseNetworks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.saved = (ls._noise_starts, ls._noise_ranges)
+
+    def tearDown(self):
+        ls._noise_starts, ls._noise_ranges = self.saved
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_nested_ranges_and_bad_lines(self):
+        path = os.path.join(self.tmpdir, 'noise_networks.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("10.0.0.0/8 Big\n10.1.0.0/16 Small\nnot-a-network\n10.1.2.0/24 Tiny\n")
+
+        self.assertEqual(ls.load_noise_networks(path), 3)
+        self.assertEqual(ls.noise_network_label('10.0.0.1'), 'Big')
+        self.assertEqual(ls.noise_network_label('10.2.0.1'), 'Big')
+        self.assertEqual(ls.noise_network_label('10.1.0.1'), 'Small')
+        self.assertEqual(ls.noise_network_label('10.1.2.3'), 'Tiny')
+        self.assertEqual(ls.noise_network_label('10.1.3.0'), 'Small')
+        self.assertIsNone(ls.noise_network_label('11.0.0.1'))
+
+class TestMigration(LoggingServerTestCase):
+
+    def test_migrate_legacy_database(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO logs (timestamp, source_ip, geo_country, protocol, target_service,"
+            " action, session_id, log_hash) VALUES (?, ?, ?, 'HTTP', 'Fake CI/CD Runner', ?, ?, ?)",
+            [
+                ('2024-01-01T00:00:00', '10.0.0.1', 'Private Network', 'login_attempt', 's1', 'h1'),
+                ('2024-01-01T00:00:01', '10.0.0.1', 'Private Network', 'file_access', 's1', 'h2'),
+                ('2024-01-01T00:00:02', '10.0.0.2', None, 'file_access', 's2', 'h3'),
+            ]
+        )
+        conn.commit()
+        conn.close()
+
+        self.open_database()
+
+        self.assertEqual(self.query("PRAGMA user_version")[0][0], ls.SCHEMA_VERSION)
+        columns = {row[1] for row in self.query("PRAGMA table_xinfo(logs)")}
+        self.assertTrue({'ml_score', 'ml_risk_level', 'is_anomaly'} <= columns)
+        self.assertNotIn('hour_bucket', columns)
+
+        self.assertEqual(self.query("SELECT ip, count FROM ip_stats ORDER BY ip"),
+                         [('10.0.0.1', 2), ('10.0.0.2', 1)])
+        self.assertEqual(self.query("SELECT action, count FROM action_stats ORDER BY action"),
+                         [('file_access', 2), ('login_attempt', 1)])
+        self.assertEqual(self.query("SELECT country, count FROM country_stats"),
+                         [('Private Network', 2)])
+
+        # Migrating is idempotent and new rows keep the rollups in step
+        self.assertTrue(ls.init_database())
+        self.assertEqual(self.post_log(make_log(7, source_ip='10.0.0.2')).status_code, 200)
+        ls.flush_pending_logs()
+        self.assertEqual(self.query("SELECT count FROM ip_stats WHERE ip = '10.0.0.2'"), [(2,)])
+
+if __name__ == '__main__':
+    unittest.main()
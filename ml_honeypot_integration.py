@@ -69,12 +69,24 @@ class MLHoneypotIntegration:
     
     def process_log(self, log_data):
         """Process a single log entry with ML prediction"""
+        self.process_logs([log_data])
+    
+    def process_logs(self, logs):
+        """Process a batch of log entries with a single ML prediction call"""
+        try:
+            analyses = self.ml_predictor.analyze_attack_patterns_batch(logs)
+        except Exception as e:
+            self.logger.error(f"Error processing logs: {e}")
+            return
+        
+        for log_data, analysis in zip(logs, analyses):
+            self._handle_analysis(log_data, analysis)
+    
+    def _handle_analysis(self, log_data, analysis):
+        """Act on the ML analysis of a single log entry"""
         try:
             self.stats['total_logs_processed'] += 1
             
-            # Analyze with ML model
-            analysis = self.ml_predictor.analyze_attack_patterns(log_data)
-            
             if analysis.get('error'):
                 self.logger.error(f"ML analysis error: {analysis['error']}")
                 return
@@ -87,11 +99,11 @@ class MLHoneypotIntegration:
                 self.stats['attacks_detected'] += 1
                 
                 # Log attack detection
-                self.logger.warning(f"🚨 ATTACK DETECTED!")
-                self.logger.warning(f"   Source IP: {log_data.get('source_ip', 'Unknown')}")
-                self.logger.warning(f"   Action: {log_data.get('action', 'Unknown')}")
-                self.logger.warning(f"   Probability: {probability:.4f}")
-                self.logger.warning(f"   Risk Level: {analysis.get('risk_level', 'Unknown')}")
+                self.logger.warning("🚨 ATTACK DETECTED!")
+                self.logger.warning("   Source IP: %s", log_data.get('source_ip', 'Unknown'))
+                self.logger.warning("   Action: %s", log_data.get('action', 'Unknown'))
+                self.logger.warning("   Probability: %.4f", probability)
+                self.logger.warning("   Risk Level: %s", analysis.get('risk_level', 'Unknown'))
                 
                 # Send alert
                 alert = self.ml_predictor.send_alert(analysis, self.webhook_url)
@@ -99,8 +111,8 @@ class MLHoneypotIntegration:
                     self.stats['alerts_sent'] += 1
                 
                 # Log detailed analysis
-                self.logger.info(f"Attack Indicators: {analysis.get('attack_indicators', [])}")
-                self.logger.info(f"Recommended Actions: {analysis.get('recommended_actions', [])}")
+                self.logger.info("Attack Indicators: %s", analysis.get('attack_indicators', []))
+                self.logger.info("Recommended Actions: %s", analysis.get('recommended_actions', []))
             
             # Log processing info
             if self.stats['total_logs_processed'] % 100 == 0:
@@ -120,17 +132,11 @@ class MLHoneypotIntegration:
                 # Fetch recent logs
                 logs = self.fetch_recent_logs(limit=50)
                 
-                # Process new logs
-                for log in logs:
-                    log_id = log.get('id')
-                    
-                    # Skip if already processed
-                    if log_id in processed_log_ids:
-                        continue
-                    
-                    # Process the log
-                    self.process_log(log)
-                    processed_log_ids.add(log_id)
+                # Process new logs, skipping those already processed
+                new_logs = [log for log in logs if log.get('id') not in processed_log_ids]
+                if new_logs:
+                    self.process_logs(new_logs)
+                    processed_log_ids.update(log.get('id') for log in new_logs)
                 
                 # Sleep before next check
                 time.sleep(5)  # Check every 5 seconds
@@ -4,15 +4,102 @@ Real-time Machine Learning Prediction System for Honeypot
 Integrates trained models with honeypot system for live attack detection
 """
 
-import pandas as pd
 import numpy as np
 import joblib
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
-from typing import Dict, Any, Optional, Tuple
+import re
+import warnings
+from typing import Dict, Any, List, Optional, Tuple
 import os
+import threading
+from collections import OrderedDict
+from sklearn.svm import SVC, NuSVC
+
+# Optional: serve the model through ONNX Runtime when it is installed
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+# Estimators whose predict() is not the argmax of predict_proba(): SVMs
+# predict from decision_function, while their probabilities come from a
+# separately fitted Platt scaling that can disagree near the boundary
+PROBA_MISMATCH_ESTIMATORS = (SVC, NuSVC)
+
+# Categorical encodings shared by every prediction
+PROTOCOL_MAPPING = {
+    'HTTP': 0, 'HTTPS': 0, 'TCP': 0,
+    'UDP': 1,
+    'ICMP': 2,
+    'FTP': 3,
+    'SSH': 4,
+    'TELNET': 5
+}
+SERVICE_MAPPING = {
+    'Fake Git Repository': 0,
+    'Fake CI/CD Runner': 1,
+    'Consolidated Honeypot Services': 2,
+    'Unknown': 3
+}
+STATE_MAPPING = {
+    'ESTABLISHED': 0,
+    'FIN': 1,
+    'CON': 2,
+    'REQ': 3,
+    'RST': 4
+}
+
+# Simulated connection values for features a honeypot log cannot supply
+DEFAULT_DURATION = 0.1
+DEFAULT_SPKTS = 10  # Source packets
+DEFAULT_DPKTS = 5   # Destination packets
+FEATURE_DEFAULTS = {
+    'dur': DEFAULT_DURATION,
+    'state': STATE_MAPPING['ESTABLISHED'],
+    'spkts': DEFAULT_SPKTS,
+    'dpkts': DEFAULT_DPKTS,
+    'rate': 100.0,
+    'sttl': 64, 'dttl': 64,
+    'sloss': 0, 'dloss': 0,
+    'sinpkt': DEFAULT_DURATION / DEFAULT_SPKTS,
+    'dinpkt': DEFAULT_DURATION / DEFAULT_DPKTS,
+    'sjit': 0.001, 'djit': 0.001,
+    'swin': 65535, 'dwin': 65535,
+    'stcpb': 0, 'dtcpb': 0,
+    'tcprtt': 0.01, 'synack': 0.01, 'ackdat': 0.01,
+    'trans_depth': 1,
+    'ct_srv_src': 1, 'ct_state_ttl': 1, 'ct_dst_ltm': 1,
+    'ct_src_dport_ltm': 1, 'ct_dst_sport_ltm': 1, 'ct_dst_src_ltm': 1,
+    'is_ftp_login': 0, 'ct_ftp_cmd': 0, 'ct_flw_http_mthd': 0,
+    'ct_src_ltm': 1, 'ct_srv_dst': 1, 'is_sm_ips_ports': 0
+}
+
+# Distinct feature inputs whose predictions are kept in memory
+PREDICTION_CACHE_SIZE = 4096
+
+# Attack indicator patterns, compiled once so each check is a single scan
+SUSPICIOUS_ACTIONS = frozenset(['file_access', 'ci_credentials_access', 'git_push'])
+SENSITIVE_FILE_RE = re.compile('|'.join(map(re.escape, ['.env', 'secrets.yml', 'config.json', 'credentials'])))
+SUSPICIOUS_WORD_RE = re.compile(r'backdoor|malicious|exploit', re.IGNORECASE)
+AUTOMATED_TOOL_RE = re.compile(r'curl|wget|python-requests', re.IGNORECASE)
+
+# Configure logging once at import; an application that already set up
+# logging keeps its own handlers
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('ml_prediction.log'),
+            logging.StreamHandler()
+        ]
+    )
+logger = logging.getLogger(__name__)
 
 class HoneypotMLPredictor:
     def __init__(self, models_path="ml_models/"):
@@ -22,19 +109,26 @@ class HoneypotMLPredictor:
         self.encoders = {}
         self.feature_selector = None
         self.best_model = None
+        self.onnx_session = None
+        self.has_predict_proba = False
+        self.predict_from_proba = False
         self.feature_columns = []
+        self.feature_index = {}
+        self.feature_template = None
         self.model_info = {}
         
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('ml_prediction.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        # Predictions keyed by the log fields the features are derived from
+        self.prediction_cache = OrderedDict()
+        self.prediction_cache_lock = threading.Lock()
+        
+        # Webhook alerts reuse pooled connections and are sent off the
+        # prediction path
+        self.webhook_session = requests.Session()
+        self.webhook_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.webhook_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.alert_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='alert-webhook')
+        
+        self.logger = logger
         
         # Load models and preprocessing objects
         self.load_models()
@@ -50,10 +144,16 @@ class HoneypotMLPredictor:
             
             self.best_model_name = self.model_info['name']
             self.feature_columns = self.model_info['feature_columns']
+            self.feature_index = {name: i for i, name in enumerate(self.feature_columns)}
+            self.feature_template = self._build_feature_template()
             
             # Load best model
             best_model_path = os.path.join(self.models_path, f"{self.best_model_name.lower()}_model.pkl")
             self.best_model = joblib.load(best_model_path)
+            self.has_predict_proba = hasattr(self.best_model, 'predict_proba')
+            self.predict_from_proba = (self.has_predict_proba and
+                                       not isinstance(self.best_model, PROBA_MISMATCH_ESTIMATORS))
+            self.onnx_session = self._load_onnx_session()
             
             # Load scalers
             for scaler_name in ['standard', 'minmax']:
@@ -76,6 +176,7 @@ class HoneypotMLPredictor:
             print(f"   Best model: {self.best_model_name}")
             print(f"   Accuracy: {self.model_info['accuracy']:.4f}")
             print(f"   Features: {len(self.feature_columns)}")
+            print(f"   Runtime: {'ONNX Runtime' if self.onnx_session else 'scikit-learn'}")
             
             return True
             
@@ -83,93 +184,84 @@ class HoneypotMLPredictor:
             print(f"❌ Error loading models: {e}")
             return False
     
-    def preprocess_honeypot_data(self, log_data: Dict[str, Any]) -> Optional[pd.DataFrame]:
-        """Preprocess honeypot log data for ML prediction"""
+    def _load_onnx_session(self):
+        """
+        Load an ONNX copy of the best model, converting and caching it when
+        missing or older than the pickle; returns None to fall back to
+        scikit-learn inference
+        """
+        if onnxruntime is None:
+            return None
+        
+        model_path = os.path.join(self.models_path, f"{self.best_model_name.lower()}_model.pkl")
+        onnx_path = os.path.join(self.models_path, f"{self.best_model_name.lower()}_model.onnx")
         try:
-            # Create a DataFrame from log data
-            # Map honeypot data to UNSW-NB15 features
-            processed_data = {}
-            
-            # Basic network features (simplified mapping)
-            processed_data['dur'] = 0.1  # Default duration
-            processed_data['proto'] = self._encode_protocol(log_data.get('protocol', 'HTTP'))
-            processed_data['service'] = self._encode_service(log_data.get('target_service', 'Unknown'))
-            processed_data['state'] = self._encode_state('ESTABLISHED')  # Default state
-            
-            # Packet and byte features (simulated based on request)
-            processed_data['spkts'] = 10  # Source packets
-            processed_data['dpkts'] = 5   # Destination packets
-            processed_data['sbytes'] = len(str(log_data.get('payload', {}))) * 10
-            processed_data['dbytes'] = len(str(log_data.get('headers', {}))) * 5
-            
-            # Rate and timing features
-            processed_data['rate'] = 100.0  # Default rate
-            processed_data['sttl'] = 64     # Source TTL
-            processed_data['dttl'] = 64     # Destination TTL
-            
-            # Load features
-            processed_data['sload'] = processed_data['sbytes'] / processed_data['dur']
-            processed_data['dload'] = processed_data['dbytes'] / processed_data['dur']
-            
-            # Loss features
-            processed_data['sloss'] = 0
-            processed_data['dloss'] = 0
-            
-            # Packet timing
-            processed_data['sinpkt'] = processed_data['dur'] / processed_data['spkts']
-            processed_data['dinpkt'] = processed_data['dur'] / processed_data['dpkts']
-            
-            # Jitter (simulated)
-            processed_data['sjit'] = 0.001
-            processed_data['djit'] = 0.001
-            
-            # Window sizes
-            processed_data['swin'] = 65535
-            processed_data['dwin'] = 65535
-            
-            # TCP features
-            processed_data['stcpb'] = 0
-            processed_data['dtcpb'] = 0
-            processed_data['tcprtt'] = 0.01
-            processed_data['synack'] = 0.01
-            processed_data['ackdat'] = 0.01
-            
-            # Statistical features
-            processed_data['smean'] = processed_data['sbytes'] / processed_data['spkts']
-            processed_data['dmean'] = processed_data['dbytes'] / processed_data['dpkts']
-            
-            # Connection features
-            processed_data['trans_depth'] = 1
-            processed_data['response_body_len'] = processed_data['dbytes']
-            
-            # Connection tracking features
-            processed_data['ct_srv_src'] = 1
-            processed_data['ct_state_ttl'] = 1
-            processed_data['ct_dst_ltm'] = 1
-            processed_data['ct_src_dport_ltm'] = 1
-            processed_data['ct_dst_sport_ltm'] = 1
-            processed_data['ct_dst_src_ltm'] = 1
-            
-            # Protocol-specific features
-            processed_data['is_ftp_login'] = 0
-            processed_data['ct_ftp_cmd'] = 0
-            processed_data['ct_flw_http_mthd'] = 0
-            processed_data['ct_src_ltm'] = 1
-            processed_data['ct_srv_dst'] = 1
-            processed_data['is_sm_ips_ports'] = 0
-            
-            # Create DataFrame
-            df = pd.DataFrame([processed_data])
+            # Retraining only rewrites the pickle, so reconvert whenever it is newer
+            if (not os.path.exists(onnx_path) or
+                    os.path.getmtime(onnx_path) < os.path.getmtime(model_path)):
+                from skl2onnx import convert_sklearn
+                from skl2onnx.common.data_types import FloatTensorType
+                
+                # zipmap=False returns probabilities as a plain (n, 2) tensor
+                onnx_model = convert_sklearn(
+                    self.best_model,
+                    initial_types=[('input', FloatTensorType([None, len(self.feature_columns)]))],
+                    options={id(self.best_model): {'zipmap': False}}
+                )
+                # Write beside the target and swap it in, so an interrupted
+                # conversion never leaves a truncated file to be loaded later
+                tmp_path = f"{onnx_path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(onnx_model.SerializeToString())
+                os.replace(tmp_path, onnx_path)
+                print(f"   Converted model to ONNX: {onnx_path}")
+            
+            return onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
             
-            # Ensure all required features are present
-            for col in self.feature_columns:
-                if col not in df.columns:
-                    df[col] = 0  # Default value for missing features
+        except Exception as e:
+            # skl2onnx missing or the estimator is not convertible
+            print(f"⚠️  ONNX Runtime unavailable for {self.best_model_name}, using scikit-learn: {e}")
+            return None
+    
+    def _build_feature_template(self) -> np.ndarray:
+        """
+        Build a (1, n_features) row holding FEATURE_DEFAULTS in training column
+        order; features missing from the mapping stay 0
+        """
+        template = np.zeros((1, len(self.feature_columns)))
+        for name, value in FEATURE_DEFAULTS.items():
+            i = self.feature_index.get(name)
+            if i is not None:
+                template[0, i] = value
+        return template
+    
+    def preprocess_honeypot_data(self, log_data: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Preprocess honeypot log data into a single feature row for ML prediction"""
+        try:
+            # Map honeypot data to UNSW-NB15 features; only the request-derived
+            # ones are written over the constant template
+            sbytes = len(str(log_data.get('payload', {}))) * 10
+            dbytes = len(str(log_data.get('headers', {}))) * 5
+            derived = {
+                'proto': self._encode_protocol(log_data.get('protocol', 'HTTP')),
+                'service': self._encode_service(log_data.get('target_service', 'Unknown')),
+                'sbytes': sbytes,
+                'dbytes': dbytes,
+                'sload': sbytes / DEFAULT_DURATION,
+                'dload': dbytes / DEFAULT_DURATION,
+                'smean': sbytes / DEFAULT_SPKTS,
+                'dmean': dbytes / DEFAULT_DPKTS,
+                'response_body_len': dbytes
+            }
             
-            # Reorder columns to match training data
-            df = df[self.feature_columns]
+            row = self.feature_template.copy()
+            feature_index = self.feature_index
+            for name, value in derived.items():
+                i = feature_index.get(name)
+                if i is not None:
+                    row[0, i] = value
             
-            return df
+            return row
             
         except Exception as e:
             self.logger.error(f"Error preprocessing honeypot data: {e}")
@@ -177,94 +269,165 @@ class HoneypotMLPredictor:
     
     def _encode_protocol(self, protocol: str) -> int:
         """Encode protocol string to numeric value"""
-        protocol_mapping = {
-            'HTTP': 0, 'HTTPS': 0, 'TCP': 0,
-            'UDP': 1,
-            'ICMP': 2,
-            'FTP': 3,
-            'SSH': 4,
-            'TELNET': 5
-        }
-        return protocol_mapping.get(protocol.upper(), 0)
+        return PROTOCOL_MAPPING.get(protocol.upper(), 0)
     
     def _encode_service(self, service: str) -> int:
         """Encode service string to numeric value"""
-        service_mapping = {
-            'Fake Git Repository': 0,
-            'Fake CI/CD Runner': 1,
-            'Consolidated Honeypot Services': 2,
-            'Unknown': 3
-        }
-        return service_mapping.get(service, 3)
+        return SERVICE_MAPPING.get(service, 3)
     
     def _encode_state(self, state: str) -> int:
         """Encode connection state to numeric value"""
-        state_mapping = {
-            'ESTABLISHED': 0,
-            'FIN': 1,
-            'CON': 2,
-            'REQ': 3,
-            'RST': 4
-        }
-        return state_mapping.get(state.upper(), 0)
+        return STATE_MAPPING.get(state.upper(), 0)
     
     def predict_attack(self, log_data: Dict[str, Any]) -> Tuple[bool, float, Dict[str, Any]]:
         """Predict if log data represents an attack"""
+        return self.predict_attack_batch([log_data])[0]
+    
+    def predict_attack_batch(self, logs: List[Dict[str, Any]]) -> List[Tuple[bool, float, Dict[str, Any]]]:
+        """
+        Predict a batch of log entries with one scaler and model call
+        Returns one (is_attack, probability, details) tuple per log, in order
+        """
+        results = [(False, 0.0, {'error': 'Failed to preprocess data'}) for _ in logs]
         try:
-            # Preprocess the data
-            processed_data = self.preprocess_honeypot_data(log_data)
-            
-            if processed_data is None:
-                return False, 0.0, {'error': 'Failed to preprocess data'}
-            
-            # Scale the data
-            if 'standard' in self.scalers:
-                processed_data = self.scalers['standard'].transform(processed_data)
-            
-            # Make prediction
-            prediction = self.best_model.predict(processed_data)[0]
-            probability = self.best_model.predict_proba(processed_data)[0][1] if hasattr(self.best_model, 'predict_proba') else 0.5
-            
-            # Prepare result
-            result = {
-                'prediction': bool(prediction),
-                'probability': float(probability),
-                'model_used': self.best_model_name,
-                'model_accuracy': self.model_info['accuracy'],
-                'timestamp': datetime.now().isoformat(),
-                'source_ip': log_data.get('source_ip', 'Unknown'),
-                'action': log_data.get('action', 'Unknown'),
-                'target_service': log_data.get('target_service', 'Unknown')
-            }
-            
-            self.logger.info(f"Prediction: {prediction}, Probability: {probability:.4f}, IP: {log_data.get('source_ip', 'Unknown')}")
+            # Serve repeated feature inputs from the cache and preprocess the
+            # rest, keeping track of which logs produced a row
+            outcomes = {}
+            rows = []
+            pending = []
+            for position, log_data in enumerate(logs):
+                key = self._feature_key(log_data)
+                cached = self._get_cached_prediction(key)
+                if cached is not None:
+                    outcomes[position] = cached
+                    continue
+                
+                row = self.preprocess_honeypot_data(log_data)
+                if row is not None:
+                    rows.append(row)
+                    pending.append((position, key))
+            
+            if rows:
+                predictions, probabilities = self._run_model(np.vstack(rows))
+                for (position, key), prediction, probability in zip(pending, predictions, probabilities):
+                    outcomes[position] = (bool(prediction), float(probability))
+                    self._cache_prediction(key, outcomes[position])
+            
+            timestamp = datetime.now().isoformat()
+            for position, (prediction, probability) in outcomes.items():
+                log_data = logs[position]
+                
+                # Prepare result
+                result = {
+                    'prediction': prediction,
+                    'probability': probability,
+                    'model_used': self.best_model_name,
+                    'model_accuracy': self.model_info['accuracy'],
+                    'timestamp': timestamp,
+                    'source_ip': log_data.get('source_ip', 'Unknown'),
+                    'action': log_data.get('action', 'Unknown'),
+                    'target_service': log_data.get('target_service', 'Unknown')
+                }
+                
+                self.logger.info("Prediction: %s, Probability: %.4f, IP: %s",
+                                 prediction, probability, log_data.get('source_ip', 'Unknown'))
+                
+                results[position] = (prediction, probability, result)
             
-            return bool(prediction), float(probability), result
+            return results
             
         except Exception as e:
             self.logger.error(f"Error making prediction: {e}")
-            return False, 0.0, {'error': str(e)}
+            if len(logs) > 1:
+                # Retry one log at a time so only the bad entries report errors
+                return [self.predict_attack(log_data) for log_data in logs]
+            return [(False, 0.0, {'error': str(e)}) for _ in logs]
+    
+    def _run_model(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scale a feature batch and return (predictions, attack probabilities)"""
+        # The scaler and model were fitted on a DataFrame but rows are passed
+        # as plain ndarrays in feature_columns order, so silence sklearn's
+        # per-call feature name warning for these calls only
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names',
+                                    category=UserWarning)
+            # Scale the data
+            if 'standard' in self.scalers:
+                batch = self.scalers['standard'].transform(batch)
+            
+            # Make predictions
+            if self.onnx_session is not None:
+                input_name = self.onnx_session.get_inputs()[0].name
+                predictions, probabilities = self.onnx_session.run(
+                    None, {input_name: batch.astype(np.float32)}
+                )
+                return predictions, probabilities[:, 1]
+            if self.predict_from_proba:
+                # One ensemble traversal; predict() is the argmax over the same
+                # probabilities
+                probabilities = self.best_model.predict_proba(batch)
+                predictions = self.best_model.classes_[probabilities.argmax(axis=1)]
+                return predictions, probabilities[:, 1]
+            if self.has_predict_proba:
+                return self.best_model.predict(batch), self.best_model.predict_proba(batch)[:, 1]
+            return self.best_model.predict(batch), np.full(len(batch), 0.5)
+    
+    def _feature_key(self, log_data: Dict[str, Any]) -> Tuple:
+        """
+        Key of everything preprocess_honeypot_data() reads from a log, so logs
+        with equal keys always get the same prediction
+        """
+        return (
+            log_data.get('protocol', 'HTTP').upper(),
+            log_data.get('target_service', 'Unknown'),
+            len(str(log_data.get('payload', {}))),
+            len(str(log_data.get('headers', {})))
+        )
+    
+    def _get_cached_prediction(self, key: Tuple) -> Optional[Tuple[bool, float]]:
+        """Return a cached (prediction, probability) for a feature key"""
+        with self.prediction_cache_lock:
+            cached = self.prediction_cache.get(key)
+            if cached is not None:
+                self.prediction_cache.move_to_end(key)
+            return cached
+    
+    def _cache_prediction(self, key: Tuple, outcome: Tuple[bool, float]):
+        """Store a prediction, evicting the least recently used entries"""
+        with self.prediction_cache_lock:
+            self.prediction_cache[key] = outcome
+            self.prediction_cache.move_to_end(key)
+            while len(self.prediction_cache) > PREDICTION_CACHE_SIZE:
+                self.prediction_cache.popitem(last=False)
     
     def analyze_attack_patterns(self, log_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze attack patterns and provide insights"""
+        return self.analyze_attack_patterns_batch([log_data])[0]
+    
+    def analyze_attack_patterns_batch(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyze a batch of log entries, sharing a single model call"""
         try:
-            is_attack, probability, prediction_result = self.predict_attack(log_data)
-            
-            # Additional analysis based on log data
-            analysis = {
-                'is_attack': is_attack,
-                'attack_probability': probability,
-                'risk_level': self._calculate_risk_level(probability),
-                'attack_indicators': self._identify_attack_indicators(log_data),
-                'recommended_actions': self._get_recommended_actions(log_data, is_attack, probability),
-                'prediction_details': prediction_result
-            }
-            
-            return analysis
+            predictions = self.predict_attack_batch(logs)
+            
+            analyses = []
+            for log_data, (is_attack, probability, prediction_result) in zip(logs, predictions):
+                # Additional analysis based on log data
+                analyses.append({
+                    'is_attack': is_attack,
+                    'attack_probability': probability,
+                    'risk_level': self._calculate_risk_level(probability),
+                    'attack_indicators': self._identify_attack_indicators(log_data),
+                    'recommended_actions': self._get_recommended_actions(log_data, is_attack, probability),
+                    'prediction_details': prediction_result
+                })
+            
+            return analyses
             
         except Exception as e:
             self.logger.error(f"Error analyzing attack patterns: {e}")
-            return {'error': str(e)}
+            if len(logs) > 1:
+                return [self.analyze_attack_patterns(log_data) for log_data in logs]
+            return [{'error': str(e)} for _ in logs]
     
     def _calculate_risk_level(self, probability: float) -> str:
         """Calculate risk level based on attack probability"""
@@ -282,30 +445,26 @@ class HoneypotMLPredictor:
         indicators = []
         
         # Check for suspicious actions
-        suspicious_actions = ['file_access', 'ci_credentials_access', 'git_push']
-        if log_data.get('action') in suspicious_actions:
+        if log_data.get('action') in SUSPICIOUS_ACTIONS:
             indicators.append(f"Suspicious action: {log_data.get('action')}")
         
         # Check for sensitive file access
-        sensitive_files = ['.env', 'secrets.yml', 'config.json', 'credentials']
-        target_file = log_data.get('target_file', '')
-        if any(file in target_file for file in sensitive_files):
+        target_file = log_data.get('target_file') or ''
+        if SENSITIVE_FILE_RE.search(target_file):
             indicators.append(f"Sensitive file access: {target_file}")
         
         # Check for suspicious payloads
         payload = log_data.get('payload', {})
         if isinstance(payload, dict):
-            if 'commit_message' in payload and any(word in str(payload['commit_message']).lower() 
-                                                 for word in ['backdoor', 'malicious', 'exploit']):
+            if 'commit_message' in payload and SUSPICIOUS_WORD_RE.search(str(payload['commit_message'])):
                 indicators.append("Suspicious commit message")
             
-            if 'job_name' in payload and any(word in str(payload['job_name']).lower() 
-                                           for word in ['malicious', 'exploit', 'backdoor']):
+            if 'job_name' in payload and SUSPICIOUS_WORD_RE.search(str(payload['job_name'])):
                 indicators.append("Suspicious job name")
         
         # Check user agent
-        user_agent = log_data.get('user_agent', '').lower()
-        if any(term in user_agent for term in ['curl', 'wget', 'python-requests']):
+        user_agent = log_data.get('user_agent') or ''
+        if AUTOMATED_TOOL_RE.search(user_agent):
             indicators.append("Automated tool usage")
         
         return indicators
@@ -361,18 +520,11 @@ class HoneypotMLPredictor:
                 }
                 
                 # Log alert
-                self.logger.warning(f"ATTACK ALERT: {alert_data}")
+                self.logger.warning("ATTACK ALERT: %s", alert_data)
                 
-                # Send to webhook if provided
+                # Send to webhook if provided, without waiting for the response
                 if webhook_url:
-                    try:
-                        response = requests.post(webhook_url, json=alert_data, timeout=5)
-                        if response.status_code == 200:
-                            self.logger.info("Alert sent to webhook successfully")
-                        else:
-                            self.logger.error(f"Failed to send alert to webhook: {response.status_code}")
-                    except Exception as e:
-                        self.logger.error(f"Error sending alert to webhook: {e}")
+                    self.alert_executor.submit(self._post_alert, webhook_url, alert_data)
                 
                 return alert_data
             
@@ -381,6 +533,17 @@ class HoneypotMLPredictor:
         
         return None
 
+    def _post_alert(self, webhook_url: str, alert_data: Dict[str, Any]):
+        """Deliver an alert to the webhook (runs on the alert executor)"""
+        try:
+            response = self.webhook_session.post(webhook_url, json=alert_data, timeout=5)
+            if response.status_code == 200:
+                self.logger.info("Alert sent to webhook successfully")
+            else:
+                self.logger.error(f"Failed to send alert to webhook: {response.status_code}")
+        except Exception as e:
+            self.logger.error(f"Error sending alert to webhook: {e}")
+
 def main():
     """Main entry point for testing"""
     print("🤖 Honeypot ML Prediction System")
@@ -10,14 +10,84 @@ import os
 import time
 import threading
 import signal
+import socket
+import select
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# The services are Flask apps; check for it once at import
+try:
+    import flask  # noqa: F401
+    DEPENDENCY_ERROR = None
+except ImportError as e:
+    DEPENDENCY_ERROR = e
+
+# How long a launched service gets to start accepting connections
+READY_TIMEOUT = 5.0  # seconds
+READY_POLL_INTERVAL = 0.025  # seconds
+MAX_PROBE_WORKERS = 8  # concurrent health checks
+HEALTH_TIMEOUT = 2  # seconds; the services are all on this host
+STATUS_INTERVAL = 60  # seconds between status lines while nothing changes
+STOP_TIMEOUT = 5  # seconds services get to exit before being killed
+
+# Where supported, each service runs in its own process group so shutdown
+# signals reach anything the service spawned as well
+USE_PROCESS_GROUPS = hasattr(os, 'killpg')
+
+# Without SIGCHLD (Windows) the monitor loop cannot tell when a child exits
+# and has to poll the services on every status tick
+HAS_SIGCHLD = hasattr(signal, 'SIGCHLD')
+
+# Each service's stdout/stderr is appended to <LOG_DIR>/<service_name>.log
+LOG_DIR = 'logs'
+LOG_TAIL_BYTES = 4096  # shown when a service fails to start
+
+# Status table rows: service name | port | status, and service name | result
+STATUS_ROW = "{:<25} | Port {:<5} | {}"
+RESULT_ROW = "{:<25} | {}"
+
+ENDPOINTS_BANNER = """\
+📋 Available Endpoints:
+----------------------------------------
+🔍 Logging Server (Port 5000):
+   GET  /health - Health check
+   GET  /stats - Statistics
+   GET  /logs - Retrieve logs
+   POST /log - Ingest logs
+
+🍯 Fake Git Repository (Port 8001):
+   GET  / - Repository info
+   POST /repo/push - Git push
+   POST /repo/pull - Git pull
+   GET  /.env - Environment file
+   GET  /secrets.yml - Secrets file
+
+🚀 Fake CI/CD Runner (Port 8002):
+   GET  / - CI/CD dashboard
+   POST /ci/run - Execute job
+   GET  /ci/status - Job status
+   GET  /ci/logs/<job_id> - Job logs
+   GET  /ci/credentials - Credentials
+
+🍯 Consolidated Honeypot (Port 8000):
+   GET  / - Service info
+   GET  /health - Health check
+   All Git & CI/CD endpoints combined
+
+"""
+
 class HoneypotManager:
     def __init__(self):
         self.processes = {}
+        self.log_files = {}
         self.running = True
         
+        # Health checks reuse keep-alive connections to the services
+        self.http_session = requests.Session()
+        self.http_session.mount('http://', HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0))
+        
         # Service configurations
         self.services = {
             'logging_server': {
@@ -45,61 +115,110 @@ class HoneypotManager:
                 'description': 'Combined Git & CI/CD services'
             }
         }
+        
+        # Resolve script paths and probe URLs once; services whose script is
+        # missing are left out entirely. Probes use the loopback address
+        # directly so no request waits on resolving "localhost"
+        for service_name, config in list(self.services.items()):
+            config['health_url'] = f"http://127.0.0.1:{config['port']}/health"
+            script_path = os.path.abspath(config['script'])
+            if os.path.isfile(script_path):
+                config['script_path'] = script_path
+            else:
+                print(f"⚠️  {config['name']}: Script not found ({config['script']})")
+                del self.services[service_name]
     
     def check_dependencies(self):
         """Check if required dependencies are installed"""
-        try:
-            import flask
-            import requests
+        if DEPENDENCY_ERROR is None:
             print("✅ Dependencies are installed")
             return True
-        except ImportError as e:
-            print(f"❌ Missing dependency: {e}")
-            print("💡 Install dependencies with: pip install Flask requests")
-            return False
+        print(f"❌ Missing dependency: {DEPENDENCY_ERROR}")
+        print("💡 Install dependencies with: pip install Flask requests")
+        return False
     
     def start_service(self, service_name, config):
         """Start a single service"""
-        script_path = config['script']
-        
-        if not os.path.exists(script_path):
-            print(f"⚠️  {config['name']}: Script not found ({script_path})")
-            return None
-        
         try:
-            print(f"🚀 Starting {config['name']} on port {config['port']}...")
+            self._emit([f"🚀 Starting {config['name']} on port {config['port']}..."])
+            # Output goes to a log file rather than a pipe nobody drains, which
+            # would stall the service once the pipe buffer filled up
+            os.makedirs(LOG_DIR, exist_ok=True)
+            log_path = os.path.join(LOG_DIR, f"{service_name}.log")
+            log_file = open(log_path, 'ab')
+            log_start = log_file.seek(0, os.SEEK_END)
+            self.log_files[service_name] = log_file
             process = subprocess.Popen(
-                [sys.executable, script_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+                [sys.executable, config['script_path']],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=USE_PROCESS_GROUPS
             )
             
-            # Wait a moment to check if the process started successfully
-            time.sleep(2)
+            # Wait until the service is listening (or has exited)
+            ready = self._wait_ready(process, config['port'], time.monotonic() + READY_TIMEOUT)
             
             if process.poll() is None:  # Process is still running
-                print(f"✅ {config['name']} started successfully (PID: {process.pid})")
+                if ready:
+                    self._emit([f"✅ {config['name']} started successfully (PID: {process.pid})"])
+                else:
+                    self._emit([f"⚠️  {config['name']} is running (PID: {process.pid}) but not yet listening on port {config['port']}"])
                 return process
             else:
-                stdout, stderr = process.communicate()
-                print(f"❌ {config['name']} failed to start")
-                print(f"   Error: {stderr}")
+                self.log_files.pop(service_name).close()
+                self._emit([f"❌ {config['name']} failed to start", f"   Error: {self._log_tail(log_path, log_start)}"])
                 return None
                 
         except Exception as e:
-            print(f"❌ Error starting {config['name']}: {e}")
+            self._emit([f"❌ Error starting {config['name']}: {e}"])
             return None
     
+    def _log_tail(self, log_path, start):
+        """Return the end of what a service wrote to its log since start"""
+        with open(log_path, 'rb') as f:
+            f.seek(max(os.path.getsize(log_path) - LOG_TAIL_BYTES, start))
+            return f.read().decode('utf-8', 'replace')
+    
+    def _wait_ready(self, process, port, deadline):
+        """
+        Poll until the service accepts TCP connections on its port. Returns
+        False if the process exits or the deadline passes first
+        """
+        while process.poll() is None:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.5)
+                if sock.connect_ex(('127.0.0.1', port)) == 0:
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(READY_POLL_INTERVAL)
+        return False
+    
     def check_service_health(self, service_name, config):
         """Check if a service is responding"""
         try:
-            response = requests.get(f"http://localhost:{config['port']}/health", timeout=5)
-            if response.status_code == 200:
-                return True
-        except:
-            pass
-        return False
+            response = self.http_session.get(config['health_url'], timeout=HEALTH_TIMEOUT)
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+    
+    def _probe_all(self, probe, service_names):
+        """
+        Run probe(service_name, config) for each service concurrently and
+        return {service_name: result}
+        """
+        if not service_names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(service_names), MAX_PROBE_WORKERS)) as executor:
+            results = executor.map(lambda name: probe(name, self.services[name]), service_names)
+            return dict(zip(service_names, results))
+    
+    def _register_started(self, service_name, process):
+        """Record a launched service, or note that it is being skipped"""
+        if process:
+            self.processes[service_name] = process
+        else:
+            print(f"⚠️  Continuing without {self.services[service_name]['name']}")
     
     def start_all_services(self):
         """Start all honeypot services"""
@@ -110,137 +229,186 @@ class HoneypotManager:
         if not self.check_dependencies():
             return False
         
-        # Start services in order (logging server first)
-        service_order = ['logging_server', 'fake_git_repo', 'fake_cicd_runner', 'consolidated_honeypot']
+        # Start the logging server first since the honeypots send their logs
+        # to it, then launch the honeypots in parallel
+        if 'logging_server' in self.services:
+            self._register_started('logging_server', self.start_service('logging_server', self.services['logging_server']))
         
-        for service_name in service_order:
-            if service_name in self.services:
-                config = self.services[service_name]
-                process = self.start_service(service_name, config)
-                
-                if process:
-                    self.processes[service_name] = process
-                    time.sleep(1)  # Give services time to start
-                else:
-                    print(f"⚠️  Continuing without {config['name']}")
+        honeypots = [name for name in ('fake_git_repo', 'fake_cicd_runner', 'consolidated_honeypot')
+                     if name in self.services]
+        if honeypots:
+            with ThreadPoolExecutor(max_workers=len(honeypots)) as executor:
+                processes = executor.map(lambda name: self.start_service(name, self.services[name]), honeypots)
+                for service_name, process in zip(honeypots, processes):
+                    self._register_started(service_name, process)
         
         return len(self.processes) > 0
     
+    def _emit(self, lines):
+        """
+        Write a block of lines to stdout in one call, so blocks printed from
+        different threads never interleave
+        """
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+    
     def monitor_services(self):
         """Monitor running services"""
-        print("\n📊 Service Status:")
-        print("-" * 40)
+        running = [name for name, process in self.processes.items() if process.poll() is None]
+        healthy = self._probe_all(self.check_service_health, running)
         
-        for service_name, process in self.processes.items():
+        lines = ["\n📊 Service Status:", "-" * 40]
+        for service_name in self.processes:
             config = self.services[service_name]
             
-            if process.poll() is None:  # Process is running
-                health_status = "✅ Healthy" if self.check_service_health(service_name, config) else "⚠️  Starting"
-                print(f"{config['name']:<25} | Port {config['port']:<5} | {health_status}")
+            if service_name in healthy:  # Process is running
+                health_status = "✅ Healthy" if healthy[service_name] else "⚠️  Starting"
+                lines.append(STATUS_ROW.format(config['name'], config['port'], health_status))
             else:
-                print(f"{config['name']:<25} | Port {config['port']:<5} | ❌ Stopped")
+                lines.append(STATUS_ROW.format(config['name'], config['port'], "❌ Stopped"))
+        self._emit(lines)
     
     def show_service_info(self):
         """Show information about running services"""
-        print("\n🌐 Available Services:")
-        print("-" * 40)
-        
+        lines = ["\n🌐 Available Services:", "-" * 40]
         for service_name, config in self.services.items():
             if service_name in self.processes:
-                print(f"🔗 {config['name']}")
-                print(f"   URL: http://localhost:{config['port']}")
-                print(f"   Description: {config['description']}")
-                print()
+                lines.extend([
+                    f"🔗 {config['name']}",
+                    f"   URL: http://localhost:{config['port']}",
+                    f"   Description: {config['description']}",
+                    ""
+                ])
+        self._emit(lines)
     
     def show_endpoints(self):
         """Show available endpoints"""
-        print("📋 Available Endpoints:")
-        print("-" * 40)
-        
-        print("🔍 Logging Server (Port 5000):")
-        print("   GET  /health - Health check")
-        print("   GET  /stats - Statistics")
-        print("   GET  /logs - Retrieve logs")
-        print("   POST /log - Ingest logs")
-        print()
-        
-        print("🍯 Fake Git Repository (Port 8001):")
-        print("   GET  / - Repository info")
-        print("   POST /repo/push - Git push")
-        print("   POST /repo/pull - Git pull")
-        print("   GET  /.env - Environment file")
-        print("   GET  /secrets.yml - Secrets file")
-        print()
-        
-        print("🚀 Fake CI/CD Runner (Port 8002):")
-        print("   GET  / - CI/CD dashboard")
-        print("   POST /ci/run - Execute job")
-        print("   GET  /ci/status - Job status")
-        print("   GET  /ci/logs/<job_id> - Job logs")
-        print("   GET  /ci/credentials - Credentials")
-        print()
-        
-        print("🍯 Consolidated Honeypot (Port 8000):")
-        print("   GET  / - Service info")
-        print("   GET  /health - Health check")
-        print("   All Git & CI/CD endpoints combined")
-        print()
+        sys.stdout.write(ENDPOINTS_BANNER)
+        sys.stdout.flush()
+    
+    def _test_service(self, service_name, config):
+        """Run the connectivity test for one service and return its result"""
+        try:
+            response = self.http_session.get(config['health_url'], timeout=HEALTH_TIMEOUT)
+            if response.status_code == 200:
+                return "✅ PASS"
+            return f"❌ FAIL (Status: {response.status_code})"
+        except Exception as e:
+            return f"❌ FAIL ({str(e)[:30]}...)"
     
     def run_tests(self):
         """Run basic connectivity tests"""
-        print("🧪 Running Connectivity Tests...")
-        print("-" * 40)
-        
-        test_results = {}
+        running = [name for name in self.services if name in self.processes]
+        results = self._probe_all(self._test_service, running)
         
+        lines = ["🧪 Running Connectivity Tests...", "-" * 40]
         for service_name, config in self.services.items():
-            if service_name in self.processes:
-                try:
-                    response = requests.get(f"http://localhost:{config['port']}/health", timeout=5)
-                    if response.status_code == 200:
-                        test_results[service_name] = "✅ PASS"
-                    else:
-                        test_results[service_name] = f"❌ FAIL (Status: {response.status_code})"
-                except Exception as e:
-                    test_results[service_name] = f"❌ FAIL ({str(e)[:30]}...)"
+            lines.append(RESULT_ROW.format(config['name'], results.get(service_name, "⚠️  SKIP (Not running)")))
+        self._emit(lines)
+    
+    def _signal_service(self, process, force):
+        """Terminate (or with force, kill) a service's process group"""
+        if not USE_PROCESS_GROUPS:
+            if force:
+                process.kill()
             else:
-                test_results[service_name] = "⚠️  SKIP (Not running)"
-        
-        for service_name, result in test_results.items():
-            config = self.services[service_name]
-            print(f"{config['name']:<25} | {result}")
+                process.terminate()
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except ProcessLookupError:
+            pass  # The service and everything it started already exited
     
     def stop_all_services(self):
         """Stop all running services"""
         print("\n🛑 Stopping all services...")
         
+        # Signal every service first so they all shut down together, then
+        # wait on them against one shared deadline
+        failed = {}
+        for service_name, process in self.processes.items():
+            try:
+                self._signal_service(process, force=False)
+            except Exception as e:
+                failed[service_name] = e
+        
+        deadline = time.monotonic() + STOP_TIMEOUT
         for service_name, process in self.processes.items():
             config = self.services[service_name]
+            if service_name in failed:
+                print(f"❌ Error stopping {config['name']}: {failed[service_name]}")
+                continue
             try:
-                process.terminate()
-                process.wait(timeout=5)
+                process.wait(timeout=max(deadline - time.monotonic(), 0))
                 print(f"✅ {config['name']} stopped")
             except subprocess.TimeoutExpired:
-                process.kill()
+                self._signal_service(process, force=True)
                 print(f"🔨 {config['name']} force killed")
             except Exception as e:
                 print(f"❌ Error stopping {config['name']}: {e}")
         
         self.processes.clear()
+        for log_file in self.log_files.values():
+            log_file.close()
+        self.log_files.clear()
+        self.http_session.close()
         print("🏁 All services stopped")
     
     def signal_handler(self, signum, frame):
         """Handle shutdown signals"""
+        if signum == getattr(signal, 'SIGHUP', None):
+            # The controlling terminal is gone, so printing to it would fail
+            sys.stdout = sys.stderr = open(os.devnull, 'w')
         print(f"\n🛑 Received signal {signum}, shutting down...")
         self.running = False
         self.stop_all_services()
         sys.exit(0)
     
+    def _install_child_watch(self):
+        """
+        Route signal wakeups to a socket the main loop can wait on, and
+        deliver SIGCHLD (where the platform has it) so dead children wake it
+        """
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        signal.set_wakeup_fd(self._wakeup_send.fileno())
+        if HAS_SIGCHLD:
+            signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    
+    def _remove_child_watch(self):
+        """Undo _install_child_watch()"""
+        if HAS_SIGCHLD:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.set_wakeup_fd(-1)
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
+    
+    def _wait_for_signal(self, timeout):
+        """
+        Block until a signal arrives or the timeout passes. Returns True if a
+        signal woke the loop
+        """
+        ready, _, _ = select.select([self._wakeup_recv], [], [], max(timeout, 0))
+        if not ready:
+            return False
+        try:
+            while self._wakeup_recv.recv(512):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+    
     def run(self):
         """Main execution loop"""
         # Set up signal handlers
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
+        # Services run in their own sessions, so a terminal hangup only
+        # reaches the manager; shut them down with it
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.signal_handler)
+        self._install_child_watch()
         
         try:
             # Start all services
@@ -253,8 +421,7 @@ class HoneypotManager:
             self.show_service_info()
             self.show_endpoints()
             
-            # Run tests
-            time.sleep(3)  # Give services time to fully start
+            # Run tests; start_service() already waited for each port to open
             self.run_tests()
             
             print("\n" + "=" * 60)
@@ -264,24 +431,34 @@ class HoneypotManager:
             print("🔍 Check http://localhost:5000/stats for analytics")
             print("=" * 60)
             
-            # Keep running until interrupted
+            # Keep running until interrupted; a child exiting wakes the loop
+            # immediately instead of at the next status tick
+            next_status = time.monotonic() + STATUS_INTERVAL
+            last_reported = len(self.processes)
             while self.running:
-                time.sleep(10)
+                signalled = self._wait_for_signal(next_status - time.monotonic())
                 
-                # Check if any services have died
+                # Check if any services have died; only a signal can mean one
+                # has where SIGCHLD is delivered
                 dead_services = []
-                for service_name, process in self.processes.items():
-                    if process.poll() is not None:
-                        dead_services.append(service_name)
+                if signalled or not HAS_SIGCHLD:
+                    dead_services = [name for name, process in self.processes.items()
+                                     if process.poll() is not None]
                 
                 if dead_services:
                     print(f"\n⚠️  Services stopped unexpectedly: {', '.join(dead_services)}")
                     for service_name in dead_services:
                         del self.processes[service_name]
                 
-                # Show periodic status
-                if len(self.processes) > 0:
-                    print(f"\n⏰ {datetime.now().strftime('%H:%M:%S')} - {len(self.processes)} services running")
+                # Show status when the number of running services changes,
+                # otherwise only once every STATUS_INTERVAL
+                running_count = len(self.processes)
+                if running_count == last_reported and time.monotonic() < next_status:
+                    continue
+                next_status = time.monotonic() + STATUS_INTERVAL
+                last_reported = running_count
+                if running_count > 0:
+                    print(f"\n⏰ {datetime.now().strftime('%H:%M:%S')} - {running_count} services running")
         
         except KeyboardInterrupt:
             print("\n🛑 Shutdown requested by user")
@@ -289,6 +466,7 @@ class HoneypotManager:
             print(f"\n❌ Unexpected error: {e}")
         finally:
             self.stop_all_services()
+            self._remove_child_watch()
 
 def main():
     """Main entry point"""